@@ -0,0 +1,58 @@
+"""Size and statistics time of the run-length compacted state stream, compared to the original.
+
+Usage: python benchmarks/compaction.py [--lines 1000000] [--change-probability 0.01]
+"""
+import argparse
+import tempfile
+from time import perf_counter
+
+from synthetic import write_state_log
+
+from dapp_manager import DappManager
+from dapp_stats import DappStats
+
+
+def _timed_stats(app_id: str):
+    start = perf_counter()
+    stats = DappStats(app_id).get_stats(checkpoint=False)
+    return stats, perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--services", type=int, default=5)
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--change-probability", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        DappManager._get_data_dir = staticmethod(lambda: tmp_dir)  # type: ignore [assignment]
+        storage = DappManager._create_storage("benchmark")
+        storage.init()
+        write_state_log(
+            storage.file_name("state"),
+            args.lines,
+            services=args.services,
+            replicas=args.replicas,
+            change_probability=args.change_probability,
+        )
+        expected, original_time = _timed_stats("benchmark")
+
+        start = perf_counter()
+        result = DappManager("benchmark").compact_state(remove_original=True)
+        compact_time = perf_counter() - start
+        stats, compacted_time = _timed_stats("benchmark")
+        assert stats == expected, "Statistics of the compacted stream differ"
+
+        print(f"{args.lines:,} lines, {result['records']:,} records")
+        for name, size, stats_time in (
+            ("original", result["source_size"], original_time),
+            ("compacted", result["compact_size"], compacted_time),
+        ):
+            print(f"{name:>10}: {size / 2**20:8.1f} MiB, stats {stats_time:6.2f}s")
+        print(f"speedup {original_time / compacted_time:.1f}x, compaction {compact_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
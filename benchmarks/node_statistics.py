@@ -0,0 +1,120 @@
+"""Memory and throughput of the statistics aggregation, compared with the legacy implementation.
+
+Usage: python benchmarks/node_statistics.py [--lines 50000] [--services 10] [--replicas 10]
+
+The `state` lines are parsed upfront, so that only the aggregation is measured. The legacy
+implementation is the `NodeStatistics` dataclass allocated for every node on every line and
+added to the accumulated one.
+"""
+import argparse
+import tempfile
+import tracemalloc
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, DefaultDict, Dict, List, Optional
+
+from synthetic import write_state_log
+
+from dapp_stats.statistics.aggregator import StatsAggregator
+from dapp_stats.statistics.enums import NodeState
+from dapp_stats.statistics.parser import StateLogParser
+from dapp_stats.statistics.schemas import StateLogEntry
+
+
+@dataclass
+class LegacyNodeStatistics:
+    timestamp: datetime
+    state: NodeState
+    _changes: int = 1
+    _launched_successfully: bool = False
+    _terminated: bool = False
+    _time_to_launch: Optional[timedelta] = None
+    _working_time: Optional[timedelta] = None
+
+    def __add__(self, other):
+        time_since_first_stat = other.timestamp - self.timestamp
+        if self.state != other.state:
+            self.state = other.state
+            self._changes += 1
+            if self.state == NodeState.running:
+                self._launched_successfully = True
+                self._time_to_launch = time_since_first_stat
+            if self.state == NodeState.terminated:
+                self._terminated = True
+                self._working_time = time_since_first_stat
+        return self
+
+
+class LegacyStatsAggregator:
+    def __init__(self):
+        self.app: Optional[LegacyNodeStatistics] = None
+        self.nodes: DefaultDict[str, Dict[int, LegacyNodeStatistics]] = defaultdict(dict)
+
+    def add(self, app_state: StateLogEntry) -> None:
+        app_stat = LegacyNodeStatistics(state=app_state.app, timestamp=app_state.timestamp)
+        if self.app is not None:
+            self.app += app_stat
+        else:
+            self.app = app_stat
+
+        for node, node_states in app_state.nodes.items():
+            for node_idx, state in node_states.items():
+                node_stat = LegacyNodeStatistics(state=state, timestamp=app_state.timestamp)
+                if node_idx in self.nodes[node]:
+                    self.nodes[node][node_idx] += node_stat
+                else:
+                    self.nodes[node][node_idx] = node_stat
+
+
+def _aggregate(entries: List[StateLogEntry], aggregator_cls: Callable):
+    aggregator = aggregator_cls()
+    for entry in entries:
+        aggregator.add(entry)
+    return aggregator
+
+
+def _measure(name: str, entries: List[StateLogEntry], aggregator_cls: Callable) -> float:
+    start = perf_counter()
+    _aggregate(entries, aggregator_cls)
+    throughput = len(entries) / (perf_counter() - start)
+
+    # Allocations are traced in a separate run, as the tracing slows them down
+    tracemalloc.start()
+    aggregator = _aggregate(entries, aggregator_cls)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = sum(len(node_stats) for node_stats in aggregator.nodes.values())
+    print(
+        f"{name:>16}: {throughput:10,.0f} lines/s, {retained / nodes:6,.0f} B retained per node,"
+        f" peak {peak / 2**10:8,.0f} KiB"
+    )
+    return throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=50_000)
+    parser.add_argument("--services", type=int, default=10)
+    parser.add_argument("--replicas", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "state"
+        write_state_log(path, args.lines, services=args.services, replicas=args.replicas)
+        state_parser = StateLogParser()
+        with open(path, "rb") as f:
+            entries = [state_parser.parse(line) for line in f]
+
+    print(f"{args.lines:,} lines, {args.services * args.replicas} nodes")
+    # Tracing the allocations slows both down, the ratio is what matters
+    legacy = _measure("legacy", entries, LegacyStatsAggregator)
+    compact = _measure("NodeStatistics", entries, StatsAggregator)
+    print(f"{'speedup':>16}: {compact / legacy:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Speedup of the statistics computed on a pool of processes over the serial fold.
+
+Usage: python benchmarks/parallel_stats.py [--lines 1000000] [--processes 1 2 4 8]
+"""
+import argparse
+import os
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from synthetic import write_state_log
+
+from dapp_stats.statistics.aggregator import StatsAggregator
+from dapp_stats.statistics.parallel import summarize_state_file
+from dapp_stats.statistics.parser import StateLogParser
+
+
+def _serial(path: Path) -> StatsAggregator:
+    aggregator = StatsAggregator()
+    parser = StateLogParser()
+    with open(path, "rb") as f:
+        for line in f:
+            aggregator.add(parser.parse(line))
+    return aggregator
+
+
+def _parallel(path: Path, processes: int) -> StatsAggregator:
+    aggregator = StatsAggregator()
+    result = summarize_state_file(path, 0, path.stat().st_size, processes)
+    assert result is not None, "The state log is too small to be processed in parallel"
+    aggregator.extend(result[0])
+    return aggregator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--services", type=int, default=5)
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "state"
+        write_state_log(path, args.lines, services=args.services, replicas=args.replicas)
+        print(
+            f"{args.lines:,} lines, {path.stat().st_size / 2**20:,.0f} MiB,"
+            f" {os.cpu_count()} CPUs"
+        )
+
+        start = perf_counter()
+        expected = _serial(path).to_dict()
+        serial_time = perf_counter() - start
+        print(f"{'serial':>14}: {serial_time:8.2f}s")
+
+        for processes in sorted(set(args.processes)):
+            if processes < 2:
+                continue
+            start = perf_counter()
+            result = _parallel(path, processes).to_dict()
+            elapsed = perf_counter() - start
+            assert result == expected, "Parallel statistics differ from the serial ones"
+            print(
+                f"{f'{processes} processes':>14}: {elapsed:8.2f}s"
+                f" ({serial_time / elapsed:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
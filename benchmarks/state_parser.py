@@ -0,0 +1,55 @@
+"""Throughput of the `state` stream parsing, in lines per second.
+
+Usage: python benchmarks/state_parser.py [--lines 2000000] [--services 5] [--replicas 2]
+
+Validating every line with `StateLogEntry` is an order of magnitude slower, so its throughput is
+measured on the first `--baseline-lines` lines only.
+"""
+import argparse
+import tempfile
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+from synthetic import write_state_log
+
+from dapp_stats.statistics.parser import StateLogParser
+from dapp_stats.statistics.schemas import StateLogEntry
+
+
+def _measure(name: str, path: Path, lines: int, parse: Callable) -> float:
+    start = perf_counter()
+    with open(path, "rb") as f:
+        for line in islice(f, lines):
+            parse(line)
+    throughput = lines / (perf_counter() - start)
+    print(f"{name:>20}: {throughput:12,.0f} lines/s")
+    return throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=2_000_000)
+    parser.add_argument("--baseline-lines", type=int, default=200_000)
+    parser.add_argument("--services", type=int, default=5)
+    parser.add_argument("--replicas", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "state"
+        write_state_log(path, args.lines, services=args.services, replicas=args.replicas)
+        print(
+            f"{args.lines:,} lines, {args.services * args.replicas} nodes,"
+            f" {path.stat().st_size / 2**20:,.0f} MiB"
+        )
+
+        validated = _measure(
+            "StateLogEntry", path, min(args.lines, args.baseline_lines), StateLogEntry.parse_raw
+        )
+        fast = _measure("StateLogParser", path, args.lines, StateLogParser().parse)
+        print(f"{'speedup':>20}: {fast / validated:12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Generators of synthetic dapp-manager data used by the benchmarks."""
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+_LIFECYCLE = ["pending", "starting", "running"]
+
+
+def write_state_log(
+    path: Path,
+    lines: int,
+    *,
+    services: int = 10,
+    replicas: int = 10,
+    change_probability: float = 0.2,
+    seed: int = 0,
+) -> None:
+    """Write a synthetic `state` stream with `lines` lines to the given path.
+
+    Nodes go through the regular lifecycle (pending -> starting -> running), occasionally become
+    unresponsive and recover. All of them are terminated on the last line. Most of the lines are
+    ticks that repeat the previous state, like in the output of a long-running app.
+    """
+
+    rng = random.Random(seed)
+    nodes: Dict[str, Dict[str, str]] = {
+        f"service-{s}": {str(r): "pending" for r in range(replicas)} for s in range(services)
+    }
+    node_keys = [(name, idx) for name, node in nodes.items() for idx in node]
+    timestamp = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    tick = timedelta(milliseconds=100)
+
+    nodes_json = json.dumps(nodes)
+    with open(path, "w") as f:
+        for line in range(lines):
+            if line == lines - 1:
+                for name, idx in node_keys:
+                    nodes[name][idx] = "terminated"
+                nodes_json = json.dumps(nodes)
+            elif rng.random() < change_probability:
+                name, idx = rng.choice(node_keys)
+                nodes[name][idx] = _next_state(nodes[name][idx], rng)
+                nodes_json = json.dumps(nodes)
+
+            app_state = _app_state([state for node in nodes.values() for state in node.values()])
+            f.write(
+                f'{{"nodes": {nodes_json}, "app": "{app_state}",'
+                f' "timestamp": "{timestamp.isoformat()}"}}\n'
+            )
+            timestamp += tick
+
+
+def _next_state(state: str, rng: random.Random) -> str:
+    if state in _LIFECYCLE[:-1]:
+        return _LIFECYCLE[_LIFECYCLE.index(state) + 1]
+    if state == "running":
+        return "unresponsive" if rng.random() < 0.5 else "running"
+    return "running"
+
+
+def _app_state(states: List[str]) -> str:
+    if all(state == "terminated" for state in states):
+        return "terminated"
+    if all(state == "running" for state in states):
+        return "running"
+    return "starting"
@@ -1,7 +1,15 @@
-from dapp_manager.cli import cli
+import os
+
+from dapp_manager.autocomplete.app_ids import COMPLETE_VAR, try_fast_completion
 
 
 def main():
+    # App id completions are served without loading the whole CLI, see `try_fast_completion`
+    if COMPLETE_VAR in os.environ and try_fast_completion():
+        return
+
+    from dapp_manager.cli import cli
+
     cli()
 
 
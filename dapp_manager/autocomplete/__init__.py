@@ -1,7 +1,6 @@
 from pathlib import Path
 
 import appdirs
-import click
 
 # Entrypoint aka binary name aka script name
 # Entrypoint must match the name defined in pyproject.toml under
@@ -18,6 +17,8 @@ DEFAULT_SHELL_FILES = {
 
 
 def install_autocomplete(shell: str, path: Path = None) -> None:
+    import click
+
     # File containing the shell-specific completion script
     script_file = SCRIPTS_DIR / f".{ENTRYPOINT}.{shell}"
     target_file = path or DEFAULT_SHELL_FILES[shell]
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import shlex
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+from dapp_manager import DappManager
+from dapp_manager.storage import SimpleStorage
+
+# Must match the variable used by the scripts in `dapp_manager/autocomplete/scripts`
+COMPLETE_VAR = "_DAPP_MANAGER_COMPLETE"
+
+# Commands taking a single app id as their first argument
+APP_ID_COMMANDS = {
+    "compact",
+    "exec",
+    "inspect",
+    "kill",
+    "read",
+    "resume",
+    "stop",
+    "suspend",
+}
+# Commands taking any number of app ids as their arguments
+APP_IDS_COMMANDS = {"resume-many", "suspend-many"}
+
+
+class AppIdIndex:
+    """Cached list of the known app ids, used to serve shell completions.
+
+    Listing the apps requires a scan of the whole data dir, so the results are kept in a small
+    index file in the cache dir, which is rebuilt only when the mtime of the data dir changes
+    (i.e. when an app is added or removed).
+
+    NOTE: The `running` flag of an indexed app is a hint only - it reflects the state at the time
+    the index was built, as stopping an app doesn't change the data dir mtime.
+    """
+
+    def __init__(self, data_dir: str, cache_dir: str):
+        self.data_dir = data_dir
+        self.cache_dir = Path(cache_dir)
+
+    @property
+    def index_file(self) -> Path:
+        data_dir_hash = hashlib.sha1(str(Path(self.data_dir).resolve()).encode()).hexdigest()
+        return self.cache_dir / f"app_ids.{data_dir_hash[:16]}.json"
+
+    def load(self) -> List[Tuple[str, bool]]:
+        """Return a list of (app_id, running) pairs, sorted by the apps' creation time."""
+
+        try:
+            data_dir_mtime = os.stat(self.data_dir).st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        try:
+            with self.index_file.open("r") as f:
+                index = json.load(f)
+            if index["data_dir_mtime"] == data_dir_mtime:
+                return [(app_id, running) for app_id, running in index["apps"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        apps = self._scan()
+        self._save(data_dir_mtime, apps)
+        return apps
+
+    def complete(self, incomplete: str, *, prefer_running: bool = True) -> List[str]:
+        """Return the app ids starting with `incomplete`, running ones first if requested."""
+
+        apps = [
+            (app_id, running) for app_id, running in self.load() if app_id.startswith(incomplete)
+        ]
+        if prefer_running:
+            apps.sort(key=lambda app: not app[1])
+        return [app_id for app_id, _ in apps]
+
+    def _scan(self) -> List[Tuple[str, bool]]:
+        return [
+            (app_id, SimpleStorage(app_id, self.data_dir).alive)
+            for app_id in SimpleStorage.app_id_list(self.data_dir)
+        ]
+
+    def _save(self, data_dir_mtime: int, apps: List[Tuple[str, bool]]) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.index_file.with_name(f"{self.index_file.name}.{os.getpid()}.tmp")
+            with tmp_file.open("w") as f:
+                json.dump({"data_dir_mtime": data_dir_mtime, "apps": apps}, f)
+            os.replace(tmp_file, self.index_file)
+        except OSError:
+            # The index is only an optimization, completion works without it
+            pass
+
+
+def complete_app_ids(incomplete: str, *, prefer_running: bool = True) -> List[str]:
+    index = AppIdIndex(DappManager._get_data_dir(), DappManager._get_cache_dir())
+    return index.complete(incomplete, prefer_running=prefer_running)
+
+
+def try_fast_completion() -> bool:
+    """Serve the shell completion request without loading the CLI, if it's an app id completion.
+
+    Mirrors the protocol of click's `_bashcomplete`. Returns False when the request is anything
+    else than an app id completion, so that it is handled by click instead.
+    """
+
+    complete_instr = os.environ.get(COMPLETE_VAR, "")
+    command, _, shell = complete_instr.partition("_")
+    if command != "complete" or shell not in ("", "bash", "zsh", "fish"):
+        return False
+
+    try:
+        cwords = shlex.split(os.environ["COMP_WORDS"])
+        if shell == "fish":
+            incomplete = os.environ["COMP_CWORD"]
+            args = cwords[1:]
+            if incomplete and args and args[-1] == incomplete:
+                args = args[:-1]
+        else:
+            cword = int(os.environ["COMP_CWORD"])
+            args = cwords[1:cword]
+            incomplete = cwords[cword] if cword < len(cwords) else ""
+    except (KeyError, ValueError):
+        return False
+
+    if not _completes_app_id(args, incomplete):
+        return False
+
+    for app_id in complete_app_ids(incomplete):
+        sys.stdout.write(f"{app_id}\n")
+        if shell == "zsh":
+            # `_` indicates no description, see click's `do_complete`
+            sys.stdout.write("_\n")
+
+    return True
+
+
+def _completes_app_id(args: List[str], incomplete: str) -> bool:
+    if not args or incomplete.startswith("-") or any(arg.startswith("-") for arg in args):
+        return False
+
+    command = args[0]
+    return (command in APP_ID_COMMANDS and len(args) == 1) or command in APP_IDS_COMMANDS
@@ -0,0 +1,112 @@
+import json
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import perf_counter
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+from .dapp_manager import DappManager
+from .exceptions import DappManagerException
+
+BATCH_MAX_PENDING_PER_WORKER = 4
+
+
+def _start(descriptors: List[str], config: str, **kwargs) -> str:
+    return DappManager.start(*descriptors, config=config, **kwargs).app_id
+
+
+def _stats(app_id: str) -> Dict:
+    from dapp_stats import DappStats
+
+    return DappStats(app_id).get_stats()
+
+
+BATCH_COMMANDS: Dict[str, Callable[..., Any]] = {
+    "start": _start,
+    "resume": lambda app_id, **kwargs: DappManager(app_id).resume(**kwargs),
+    "list": DappManager.list,
+    "prune": DappManager.prune,
+    "stop": lambda app_id, timeout=10: DappManager(app_id).stop(timeout),
+    "kill": lambda app_id: DappManager(app_id).kill(),
+    "exec": lambda app_id, service, command, timeout=60: DappManager(app_id).run_command(
+        service, command, timeout
+    ),
+    "inspect": lambda app_id: DappManager(app_id).inspect(),
+    "suspend": lambda app_id: DappManager(app_id).suspend(),
+    "read": lambda app_id, file_type, ensure_alive=True: DappManager(app_id).read_file(
+        file_type, ensure_alive=ensure_alive
+    ),
+    "stats": _stats,
+    "compact": lambda app_id, remove_original=False: DappManager(app_id).compact_state(
+        remove_original=remove_original
+    ),
+}
+
+
+class BatchRunner:
+    """Run multiple dapp-manager commands in a single process.
+
+    Each command is a JSON object in the form of:
+        {"command": "read", "args": {"app_id": "...", "file_type": "state"}, "id": "..."}
+    where `args` are the keyword arguments of the corresponding `DappManager` method
+    and the optional `id` is passed back in the result, to help match results with commands.
+
+    A failure of a single command is reported in its result and doesn't affect the others.
+    Results are yielded in the order of the commands, even when they're run concurrently.
+    """
+
+    def __init__(self, max_workers: int = 1):
+        self.max_workers = max_workers
+
+    def run(self, lines: Iterable[str]) -> Iterator[Dict]:
+        commands = (line for line in lines if line.strip())
+
+        if self.max_workers <= 1:
+            for line in commands:
+                yield self.run_command(line)
+            return
+
+        # Keep a bounded number of commands in flight, so that we don't have to read the whole
+        # input before emitting the first result
+        pending: Deque[Future] = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for line in commands:
+                pending.append(executor.submit(self.run_command, line))
+                if len(pending) >= self.max_workers * BATCH_MAX_PENDING_PER_WORKER:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+
+    def run_command(self, line: str) -> Dict:
+        """Run a single command given as a JSON string, return its result."""
+
+        start = perf_counter()
+        command_id: Optional[Any] = None
+        command_name: Optional[str] = None
+
+        try:
+            command = json.loads(line)
+            if not isinstance(command, dict):
+                raise ValueError("Command must be a JSON object.")
+            command_id = command.get("id")
+            command_name = command.get("command")
+            if command_name not in BATCH_COMMANDS:
+                raise ValueError(f"Unknown command: {command_name!r}.")
+
+            result = BATCH_COMMANDS[command_name](**command.get("args", {}))
+        except Exception as e:
+            error: Dict[str, Any] = {"type": type(e).__name__, "message": str(e)}
+            if isinstance(e, DappManagerException):
+                error["exit_code"] = e.SHELL_EXIT_CODE
+            return self._result(command_id, command_name, start, ok=False, error=error)
+
+        return self._result(command_id, command_name, start, ok=True, result=result)
+
+    @staticmethod
+    def _result(
+        command_id: Optional[Any], command_name: Optional[str], start: float, **kwargs
+    ) -> Dict:
+        result = {"command": command_name, **kwargs, "elapsed": perf_counter() - start}
+        if command_id is not None:
+            result["id"] = command_id
+        return result
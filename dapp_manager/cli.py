@@ -1,19 +1,42 @@
+import json
 import sys
 from functools import wraps
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 import click
-from dapp_runner.log import LOG_CHOICES
 
 from dapp_manager import DappManager
 from dapp_manager.autocomplete import install_autocomplete
+from dapp_manager.autocomplete.app_ids import complete_app_ids
+from dapp_manager.dapp_manager import BULK_OPERATION_MAX_WORKERS, AppOperationResult
 from dapp_manager.exceptions import DappManagerException
 from dapp_manager.storage import RunnerReadFileType
 
 
+class _LogLevelChoice(click.Choice):
+    """Choice of the `dapp-runner` log levels, resolved only once actually needed.
+
+    Importing `dapp_runner` pulls in the whole requestor stack, which we don't want to pay for in
+    every command (or on every shell completion request).
+    """
+
+    def __init__(self):
+        super().__init__([], case_sensitive=False)
+
+    @property  # type: ignore [override]
+    def choices(self):
+        from dapp_runner.log import LOG_CHOICES
+
+        return [*LOG_CHOICES]
+
+    @choices.setter
+    def choices(self, _value):
+        pass
+
+
 def _app_id_autocomplete(ctx, args, incomplete):  # noqa
-    return [app_id for app_id in DappManager.list() if app_id.startswith(incomplete)]
+    return complete_app_ids(incomplete)
 
 
 def _with_app_id(wrapped_func):
@@ -23,6 +46,49 @@ def _with_app_id(wrapped_func):
     return wrapped_func
 
 
+def _with_app_ids(wrapped_func):
+    wrapped_func = click.option(
+        "--max-workers",
+        "-j",
+        type=int,
+        default=BULK_OPERATION_MAX_WORKERS,
+        show_default=True,
+        help="Maximum number of apps processed concurrently.",
+    )(wrapped_func)
+    wrapped_func = click.option(
+        "--all",
+        "all_apps",
+        is_flag=True,
+        default=False,
+        help="Process all eligible apps instead of the given APP_IDS.",
+    )(wrapped_func)
+    wrapped_func = click.argument(
+        "app-ids", nargs=-1, type=click.STRING, autocompletion=_app_id_autocomplete
+    )(wrapped_func)
+    return wrapped_func
+
+
+def _get_app_ids(app_ids: Sequence[str], all_apps: bool) -> Optional[Sequence[str]]:
+    if all_apps and app_ids:
+        raise click.UsageError("Either pass APP_IDS or use `--all`, not both.")
+    if not all_apps and not app_ids:
+        raise click.UsageError("Pass at least one APP_ID or use `--all`.")
+    return None if all_apps else app_ids
+
+
+def _print_operation_results(results: List[AppOperationResult]) -> None:
+    for result in results:
+        elapsed = result.elapsed.total_seconds()
+        if result.success:
+            print(f"{result.app_id}: {result.message} ({elapsed:.2f}s)")
+        else:
+            print(f"{result.app_id}: {result.error} ({elapsed:.2f}s)", file=sys.stderr)
+
+    failed = [result for result in results if not result.success]
+    if failed:
+        raise DappManagerException(f"Operation failed for {len(failed)} of {len(results)} apps.")
+
+
 def _capture_api_exceptions(f):
     @wraps(f)
     def wrapped(*args, **kwargs):
@@ -56,7 +122,7 @@ def cli():
 )
 @click.option(
     "--log-level",
-    type=click.Choice(LOG_CHOICES, case_sensitive=False),
+    type=_LogLevelChoice(),
 )
 @click.option("--api-port", type=int, help="Enable the GAOM API on a given port.")
 @click.option(
@@ -108,7 +174,7 @@ def start(
 )
 @click.option(
     "--log-level",
-    type=click.Choice(LOG_CHOICES, case_sensitive=False),
+    type=_LogLevelChoice(),
 )
 @click.option("--api-port", type=int, help="Enable the GAOM API on a given port.")
 @click.option(
@@ -152,6 +218,49 @@ def resume(
     )
 
 
+@cli.command("resume-many")
+@_with_app_ids
+@click.option(
+    "--config",
+    "-c",
+    required=True,
+    type=Path,
+    help="Path to the file containing yagna-specific config.",
+)
+@click.option(
+    "--log-level",
+    type=_LogLevelChoice(),
+)
+@click.option(
+    "--skip-manifest-validation",
+    is_flag=True,
+    default=False,
+)
+@_capture_api_exceptions
+def resume_many(
+    app_ids: Tuple[str],
+    *,
+    all_apps: bool,
+    max_workers: int,
+    config: Path,
+    log_level: Optional[str],
+    skip_manifest_validation: bool,
+):
+    """Resume multiple applications from their saved states concurrently.
+
+    With `--all`, every stopped app with a saved state is resumed. Each app is resumed with the
+    GAOM API address it was started with.
+    """
+    results = DappManager.resume_many(
+        _get_app_ids(app_ids, all_apps),
+        config=config,
+        log_level=log_level,
+        skip_manifest_validation=skip_manifest_validation,
+        max_workers=max_workers,
+    )
+    _print_operation_results(results)
+
+
 @cli.command()
 @_capture_api_exceptions
 def list():
@@ -249,6 +358,33 @@ def suspend(*, app_id):
     print(dapp.suspend())
 
 
+@cli.command("suspend-many")
+@_with_app_ids
+@_capture_api_exceptions
+def suspend_many(app_ids: Tuple[str], *, all_apps: bool, max_workers: int):
+    """Suspend multiple running applications concurrently and save their states.
+
+    With `--all`, every running app is suspended.
+    """
+    results = DappManager.suspend_many(_get_app_ids(app_ids, all_apps), max_workers=max_workers)
+    _print_operation_results(results)
+
+
+@cli.command()
+@_with_app_id
+@click.option(
+    "--remove-original",
+    is_flag=True,
+    default=False,
+    help="Remove the original state file once compacted. The app must not be running.",
+)
+@_capture_api_exceptions
+def compact(*, app_id: str, remove_original: bool):
+    """Collapse consecutive identical entries of the app's state stream into run-length records."""
+    dapp = DappManager(app_id)
+    print(json.dumps(dapp.compact_state(remove_original=remove_original), indent=2))
+
+
 @cli.command()
 @_with_app_id
 @click.argument("file-type", type=click.Choice(["state", "data", "log", "stdout", "stderr"]))
@@ -275,6 +411,39 @@ def read(app_id: str, file_type: RunnerReadFileType, ensure_alive: bool, follow:
         print(dapp.read_file(file_type, ensure_alive=ensure_alive), end="")
 
 
+@cli.command()
+@click.argument("commands-file", type=click.File("r"), default="-")
+@click.option(
+    "--jobs",
+    "-j",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of commands run concurrently.",
+)
+def batch(commands_file, jobs: int):
+    """Run multiple commands in a single process.
+
+    Commands are read from COMMANDS_FILE (or stdin) as newline-delimited JSON objects, e.g.:
+
+        {"command": "read", "args": {"app_id": "...", "file_type": "state"}, "id": 1}
+
+    One JSON result per command is printed, in the order of the commands. The exit code is
+    non-zero if any of the commands failed.
+    """
+    import json
+
+    from dapp_manager.batch import BatchRunner
+
+    failed = False
+    for result in BatchRunner(max_workers=jobs).run(commands_file):
+        failed = failed or not result["ok"]
+        print(json.dumps(result, default=str), flush=True)
+
+    if failed:
+        sys.exit(DappManagerException.SHELL_EXIT_CODE)
+
+
 @cli.command()
 @click.argument("shell", type=click.Choice(["bash", "fish", "zsh"]))
 @click.option(
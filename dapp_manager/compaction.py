@@ -0,0 +1,209 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+from .storage import SimpleStorage
+
+COMPACT_STATE_VERSION = 1
+
+# Size of the chunk read from the end of the file when looking for its last line
+_TRAILER_READ_SIZE = 4096
+
+
+def _digest(line: bytes) -> str:
+    return hashlib.sha1(line).hexdigest()
+
+
+def _read_last_line(f: BinaryIO) -> bytes:
+    size = f.seek(0, 2)
+    read_size = _TRAILER_READ_SIZE
+    while True:
+        f.seek(max(0, size - read_size))
+        lines = f.read().splitlines()
+        if len(lines) > 1 or read_size >= size:
+            return lines[-1] if lines else b""
+        read_size *= 2
+
+
+@dataclass
+class CompactState:
+    """Run-length compacted `state` stream of an app.
+
+    Consecutive entries of the `state` stream with the same app and node states are collapsed into
+    a single record - the first of the entries, extended with the timestamp of the last one
+    (`until`), the number of the entries (`repeat`) and the offset of the first one in the stream
+    (`offset`). The records are written to the `state_compact` file, followed by a trailer line
+    describing the compacted part of the stream.
+
+    All offsets are the ones in the original `state` stream. Once the original `state` file is
+    removed, a `state` file written afterwards (e.g. by a resumed app) continues the stream from
+    the `state_base` offset.
+    """
+
+    # Offset in the stream up to which it is compacted
+    source_offset: int = 0
+    # Digest of the first line of the stream, identifies the stream the records are for
+    source_head_digest: Optional[str] = None
+    # Offset in the stream of the start of the current `state` file
+    state_base: int = 0
+    records: int = 0
+
+    @classmethod
+    def load(cls, storage: SimpleStorage) -> Optional["CompactState"]:
+        """Return the description of the app's compacted `state` stream.
+
+        Returns None if the stream isn't compacted, or if the compacted records are stale, i.e. the
+        `state` file was rewritten since the compaction.
+        """
+
+        try:
+            with storage.open("state_compact", "rb") as f:
+                trailer = json.loads(_read_last_line(f))
+            if trailer["version"] != COMPACT_STATE_VERSION:
+                return None
+            compact_state = cls(
+                source_offset=trailer["source_offset"],
+                source_head_digest=trailer["source_head_digest"],
+                state_base=trailer["state_base"],
+                records=trailer["records"],
+            )
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return None
+
+        return compact_state if compact_state._matches_state_file(storage) else None
+
+    @classmethod
+    def compact(cls, storage: SimpleStorage, *, remove_original: bool = False) -> "CompactState":
+        """Compact the app's `state` stream, continuing the previous compaction if there is one.
+
+        The `state_compact` file is replaced atomically. With `remove_original`, the `state` file
+        is removed afterwards - which must only be done once the app stopped writing to it.
+        """
+
+        previous = cls.load(storage) or cls()
+        compact_state = cls(
+            source_offset=previous.source_offset,
+            source_head_digest=previous.source_head_digest,
+            state_base=previous.state_base,
+        )
+        run: Optional[Dict] = None
+
+        with storage.atomic_writer("state_compact") as f:
+
+            def write_run():
+                f.write(json.dumps(run).encode() + b"\n")
+                compact_state.records += 1
+
+            # The last record is the run that the following entries may continue
+            for _, raw_record in previous.iter_records(storage):
+                if run is not None:
+                    write_run()
+                run = json.loads(raw_record)
+
+            for raw_state, end_offset in previous.iter_tail(storage, previous.source_offset):
+                if end_offset == len(raw_state):
+                    compact_state.source_head_digest = _digest(raw_state)
+                entry = json.loads(raw_state)
+                if (
+                    run is not None
+                    and entry["app"] == run["app"]
+                    and entry["nodes"] == run["nodes"]
+                ):
+                    run["until"] = entry["timestamp"]
+                    run["repeat"] += 1
+                else:
+                    if run is not None:
+                        write_run()
+                    run = {
+                        **entry,
+                        "until": entry["timestamp"],
+                        "repeat": 1,
+                        "offset": end_offset - len(raw_state),
+                    }
+                compact_state.source_offset = end_offset
+
+            if run is not None:
+                write_run()
+            if remove_original:
+                compact_state.state_base = compact_state.source_offset
+            f.write(json.dumps(compact_state._trailer()).encode() + b"\n")
+
+        if remove_original:
+            try:
+                storage.file_name("state").unlink()
+            except FileNotFoundError:
+                pass
+
+        return compact_state
+
+    def stream_size(self, storage: SimpleStorage) -> int:
+        """Return the current size of the whole stream, the compacted part included."""
+
+        try:
+            return max(
+                self.source_offset, self.state_base + storage.file_name("state").stat().st_size
+            )
+        except FileNotFoundError:
+            return self.source_offset
+
+    def iter_entries(
+        self, storage: SimpleStorage, start_pos: int = 0
+    ) -> Iterator[Tuple[bytes, int]]:
+        """Yield the raw entries of the stream following `start_pos`, with the offsets after them.
+
+        The compacted records come first, then the lines of the `state` file following them.
+        A record whose run starts before `start_pos` is skipped, as the remaining entries of the
+        run don't change anything.
+        """
+
+        pending: Optional[bytes] = None
+        for offset, raw_record in self.iter_records(storage):
+            if pending is not None:
+                yield pending, offset
+            pending = raw_record if offset >= start_pos else None
+        if pending is not None:
+            yield pending, self.source_offset
+
+        yield from self.iter_tail(storage, max(start_pos, self.source_offset))
+
+    def iter_records(self, storage: SimpleStorage) -> Iterator[Tuple[int, bytes]]:
+        """Yield the compacted records with the offsets of their runs in the stream."""
+
+        if not self.records:
+            return
+
+        with storage.open("state_compact", "rb") as f:
+            for _, raw_record in zip(range(self.records), f):
+                yield json.loads(raw_record)["offset"], raw_record
+
+    def iter_tail(self, storage: SimpleStorage, start_pos: int) -> Iterator[Tuple[bytes, int]]:
+        """Yield the complete lines of the `state` file from the stream offset `start_pos`."""
+
+        for raw_state in storage.iter_file_raw_lines(
+            "state", start_pos=start_pos - self.state_base
+        ):
+            start_pos += len(raw_state)
+            yield raw_state, start_pos
+
+    def _matches_state_file(self, storage: SimpleStorage) -> bool:
+        try:
+            with storage.open("state", "rb") as f:
+                size = f.seek(0, 2)
+                if self.state_base:
+                    return self.state_base + size >= self.source_offset
+                f.seek(0)
+                return size >= self.source_offset and (
+                    not self.source_offset or _digest(f.readline()) == self.source_head_digest
+                )
+        except FileNotFoundError:
+            return True
+
+    def _trailer(self) -> Dict:
+        return {
+            "version": COMPACT_STATE_VERSION,
+            "source_offset": self.source_offset,
+            "source_head_digest": self.source_head_digest,
+            "state_base": self.state_base,
+            "records": self.records,
+        }
@@ -4,18 +4,25 @@ import re
 import signal
 import sys
 import uuid
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from time import sleep
-from typing import Iterator, List, Optional, Union
+from time import perf_counter, sleep
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Union
 
 import appdirs
 import psutil
-import requests
 
+from .compaction import CompactState
 from .dapp_starter import DappStarter
-from .exceptions import AppNotRunning, AppRunning, GaomApiError, GaomApiUnavailable, NoGaomSaveFile
-from .inspect import Inspect
+from .exceptions import (
+    AppNotRunning,
+    AppRunning,
+    DappManagerException,
+    GaomApiError,
+    GaomApiUnavailable,
+    NoGaomSaveFile,
+)
 from .storage import RunnerReadFileType, SimpleStorage
 
 PathType = Union[str, os.PathLike]
@@ -23,6 +30,21 @@ PathType = Union[str, os.PathLike]
 COMMAND_OUTPUT_INTERVAL = timedelta(seconds=1)
 READ_FILE_FOLLOW_INTERVAL = timedelta(milliseconds=100)
 READ_FILE_CHUNK_SIZE = 1024
+BULK_OPERATION_MAX_WORKERS = 8
+
+
+@dataclass
+class AppOperationResult:
+    """Outcome of an operation performed on a single app as a part of a bulk operation."""
+
+    app_id: str
+    elapsed: timedelta
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
 
 
 class DappManager:
@@ -101,6 +123,67 @@ class DappManager:
                 pruned.append(app_id)
         return pruned
 
+    @classmethod
+    def suspend_many(
+        cls,
+        app_ids: Optional[Sequence[str]] = None,
+        *,
+        max_workers: int = BULK_OPERATION_MAX_WORKERS,
+    ) -> List[AppOperationResult]:
+        """Suspend multiple apps concurrently.
+
+        If `app_ids` is not given, all the running apps are suspended.
+
+        Returns a list of per-app results, in the order of `app_ids`.
+        """
+
+        if app_ids is None:
+            app_ids = [app_id for app_id in cls.list() if cls(app_id).alive]
+
+        return cls._run_many(app_ids, lambda dapp: dapp.suspend(), max_workers=max_workers)
+
+    @classmethod
+    def resume_many(
+        cls,
+        app_ids: Optional[Sequence[str]] = None,
+        *,
+        config: PathType,
+        log_level: Optional[str] = None,
+        skip_manifest_validation: bool = False,
+        timeout: float = 1,
+        max_workers: int = BULK_OPERATION_MAX_WORKERS,
+    ) -> List[AppOperationResult]:
+        """Resume multiple apps from their saved states concurrently.
+
+        If `app_ids` is not given, all the stopped apps with a saved state are resumed.
+
+        Each app is resumed with the GAOM API address it was previously started with (if any),
+        as the apps can't share a single API port.
+
+        Returns a list of per-app results, in the order of `app_ids`.
+        """
+
+        if app_ids is None:
+            app_ids = [
+                app_id
+                for app_id in cls.list()
+                if cls._create_storage(app_id).gaom_saved and not cls(app_id).alive
+            ]
+
+        def _resume(dapp: "DappManager") -> str:
+            api_endpoint = dapp.storage.read_api_endpoint()
+            api_host, api_port = api_endpoint if api_endpoint else (None, None)
+            return dapp.resume(
+                config,
+                log_level=log_level,
+                api_host=api_host,
+                api_port=api_port,
+                skip_manifest_validation=skip_manifest_validation,
+                timeout=timeout,
+            )
+
+        return cls._run_many(app_ids, _resume, max_workers=max_workers)
+
     ###########################
     #   PUBLIC INSTANCE METHODS
     def read_file(self, file_type: RunnerReadFileType, *, ensure_alive: bool = True) -> str:
@@ -110,11 +193,18 @@ class DappManager:
         not running.
 
         FileNotFoundError exception will be raised if stream is inaccessible (for e.g. deleted).
+
+        If the original `state` lines were removed by `compact_state`, the compacted records
+        are returned in their place.
         """
 
         if ensure_alive:
             self._ensure_alive()
 
+        compact_state = self._compacted_stream(file_type)
+        if compact_state is not None:
+            return "".join(raw.decode() for raw, _ in compact_state.iter_entries(self.storage))
+
         return self.storage.read_file(file_type)
 
     def read_file_follow(
@@ -132,6 +222,7 @@ class DappManager:
 
         file_pos = 0
         is_initial_check = True
+        compact_state = self._compacted_stream(file_type)
 
         while True:
             if ensure_alive:
@@ -142,6 +233,12 @@ class DappManager:
                         raise
                     return
 
+            if is_initial_check and compact_state is not None:
+                # Original lines were removed, the stream continues after the compacted records
+                for _, raw_record in compact_state.iter_records(self.storage):
+                    yield raw_record.decode()
+                file_pos = compact_state.source_offset - compact_state.state_base
+
             try:
                 for read_size, data in self.storage.iter_file_chunks(
                     file_type, start_pos=file_pos, chunk_size=READ_FILE_CHUNK_SIZE
@@ -150,9 +247,10 @@ class DappManager:
                     yield data
 
             except FileNotFoundError:
-                if is_initial_check:
-                    raise
-                return
+                if compact_state is None:
+                    if is_initial_check:
+                        raise
+                    return
 
             # If we managed to get here, special behaviour for initial checks are no longer needed
             is_initial_check = False
@@ -180,6 +278,15 @@ class DappManager:
             print(stderr)
 
     def exec_command(self, service: str, command: List[str], timeout: int):
+        for cdict in self.run_command(service, command, timeout):
+            self.__print_executed_command(cdict)
+
+    def run_command(self, service: str, command: List[str], timeout: int) -> List[Dict]:
+        """Execute `command` on the given service and return the results reported by the runner.
+
+        Returns an empty list if the runner doesn't report the results within `timeout` seconds.
+        """
+
         self._ensure_alive()
 
         service_name, service_idx = self.__parse_service_str(service)
@@ -202,15 +309,35 @@ class DappManager:
                 msg = json.loads(data_out)
 
                 if isinstance(msg, dict):
-                    commands = msg.get(service_name, {}).get(str(service_idx))
-                    for cdict in commands:
-                        self.__print_executed_command(cdict)
-                    break
+                    return msg.get(service_name, {}).get(str(service_idx)) or []
 
                 raise TimeoutError()
 
+        return []
+
+    def compact_state(self, *, remove_original: bool = False) -> Dict:
+        """Collapse consecutive identical entries of the `state` stream into run-length records.
+
+        The records are written to a separate file, see `CompactState`. Compaction is incremental,
+        each call only processes the lines appended since the previous one. With `remove_original`,
+        the original `state` file is removed - which is only allowed once the app is stopped.
+        """
+
+        if remove_original:
+            self._ensure_stopped()
+
+        compact_state = CompactState.compact(self.storage, remove_original=remove_original)
+        return {
+            "records": compact_state.records,
+            "source_size": compact_state.source_offset,
+            "compact_size": self.storage.file_name("state_compact").stat().st_size,
+            "original_removed": compact_state.state_base > 0,
+        }
+
     def inspect(self) -> str:
         """Query the GAOM API and present a comprehensive report."""
+        from .inspect import Inspect
+
         self._ensure_alive()
         api = self._ensure_api()
         inspect = Inspect(api)
@@ -218,6 +345,8 @@ class DappManager:
 
     def suspend(self) -> str:
         """Signal the runner to suspend its operation and preserve the app's state."""
+        import requests
+
         self._ensure_alive()
         api = self._ensure_api()
         app_gaom = requests.post(f"{api}/suspend")
@@ -329,6 +458,14 @@ class DappManager:
         if self.alive:
             raise AppRunning(self.app_id)
 
+    def _compacted_stream(self, file_type: RunnerReadFileType) -> Optional[CompactState]:
+        """Return the compaction of the stream if it replaced the original lines."""
+
+        if file_type != "state":
+            return None
+        compact_state = CompactState.load(self.storage)
+        return compact_state if compact_state is not None and compact_state.state_base else None
+
     def _ensure_api(self) -> str:
         if not self.storage.api:
             raise GaomApiUnavailable(self.app_id)
@@ -356,6 +493,36 @@ class DappManager:
 
     ####################
     #   STATIC UTILITIES
+    @classmethod
+    def _run_many(
+        cls,
+        app_ids: Sequence[str],
+        operation: Callable[["DappManager"], str],
+        *,
+        max_workers: int,
+    ) -> List[AppOperationResult]:
+        from concurrent.futures import ThreadPoolExecutor
+
+        import requests
+
+        def _run(app_id: str) -> AppOperationResult:
+            start = perf_counter()
+            try:
+                message = operation(cls(app_id))
+            except (DappManagerException, requests.RequestException) as e:
+                return AppOperationResult(
+                    app_id, timedelta(seconds=perf_counter() - start), error=str(e)
+                )
+            return AppOperationResult(
+                app_id, timedelta(seconds=perf_counter() - start), message=message
+            )
+
+        if not app_ids:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(app_ids))) as executor:
+            return [*executor.map(_run, app_ids)]
+
     @classmethod
     def _create_storage(cls, app_id: str) -> SimpleStorage:
         return SimpleStorage(app_id, cls._get_data_dir())
@@ -363,3 +530,7 @@ class DappManager:
     @staticmethod
     def _get_data_dir() -> str:
         return appdirs.user_data_dir("dapp_manager", "golemfactory")
+
+    @staticmethod
+    def _get_cache_dir() -> str:
+        return appdirs.user_cache_dir("dapp_manager", "golemfactory")
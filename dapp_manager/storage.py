@@ -2,6 +2,7 @@ import io
 import os
 import re
 import shutil
+import uuid
 from contextlib import contextmanager
 from pathlib import Path
 from typing import Iterator, List, Literal, Optional, Tuple, Union
@@ -12,7 +13,16 @@ READ_FILE_ITER_CHUNK_SIZE = 1024
 
 PublicRunnerFileType = Literal["data", "state", "log", "stdout", "stderr", "commands"]
 RunnerFileType = Literal[
-    "data", "state", "log", "stdout", "stderr", "commands", "gaom_save", "gaom_resume"
+    "data",
+    "state",
+    "log",
+    "stdout",
+    "stderr",
+    "commands",
+    "gaom_save",
+    "gaom_resume",
+    "stats_checkpoint",
+    "state_compact",
 ]
 RunnerReadFileType = Literal["data", "state", "log", "stdout", "stderr"]
 
@@ -127,10 +137,55 @@ class SimpleStorage:
         except FileNotFoundError:
             return
 
+    def iter_file_raw_lines(
+        self, file_type: RunnerReadFileType, *, start_pos: int = 0
+    ) -> Iterator[bytes]:
+        """Yield complete lines of the given stream as bytes, starting at the `start_pos` offset.
+
+        A trailing line without the newline (i.e. one that is still being written) is not yielded,
+        so that the offset following the last yielded line is a safe place to resume reading from.
+        """
+
+        try:
+            with self.open(file_type, "rb") as f:
+                f.seek(start_pos)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        return
+                    yield line
+        except FileNotFoundError:
+            return
+
     def write_file(self, file_type: RunnerFileType, data: str):
         with self.open(file_type, "a") as f:
             return f.write(data)
 
+    def replace_file(self, file_type: RunnerFileType, data: str) -> None:
+        """Atomically replace the contents of the given file.
+
+        Readers will always see either the previous or the new contents, never a partial write.
+        """
+
+        with self.atomic_writer(file_type, "w") as f:
+            f.write(data)
+
+    @contextmanager
+    def atomic_writer(self, file_type: RunnerFileType, mode: str = "wb"):
+        """Open a temporary file replacing the given one once the context exits successfully.
+
+        Readers will always see either the previous or the new contents, never a partial write.
+        """
+
+        file_name = self.file_name(file_type)
+        tmp_file_name = file_name.with_name(f"{file_name.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with tmp_file_name.open(mode) as f:
+                yield f
+            os.replace(tmp_file_name, file_name)
+        finally:
+            if tmp_file_name.exists():
+                tmp_file_name.unlink()
+
     @classmethod
     def app_id_list(cls, data_dir: str) -> List[str]:
         try:
@@ -156,15 +211,23 @@ class SimpleStorage:
     def archived_pid_file(self) -> Path:
         return self.file_name("_old_pid")
 
-    def fetch_api_address(self):
+    def read_api_endpoint(self) -> Optional[Tuple[str, int]]:
+        """Return the saved GAOM API host and port or None if the API was never enabled."""
+
         try:
             with self.api_host_file.open("r") as f:
                 host = f.read()
             with self.api_port_file.open("r") as f:
                 port = int(f.read())
-            self._api_address = f"http://{host}:{port}"
         except FileNotFoundError:
-            pass
+            return None
+        return host, port
+
+    def fetch_api_address(self):
+        api_endpoint = self.read_api_endpoint()
+        if api_endpoint:
+            host, port = api_endpoint
+            self._api_address = f"http://{host}:{port}"
 
     @property
     def api(self) -> Optional[str]:
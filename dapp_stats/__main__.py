@@ -1,15 +1,21 @@
 import json
 import logging
 import sys
+from datetime import datetime
 from functools import wraps
 from pathlib import Path
-from typing import Sequence
+from typing import Optional, Sequence
 
 import click
 from click import ClickException
 
 from dapp_stats import DappStats
-from dapp_stats.dapp_size_resolver import DappSizeResolver, DappSizeResolverError
+from dapp_stats.dapp_size_resolver import (
+    SIZE_RESOLVER_MAX_WORKERS,
+    DappSizeResolver,
+    DappSizeResolverError,
+)
+from dapp_stats.statistics.parser import parse_timestamp
 
 from .exceptions import DappStatsException
 
@@ -33,6 +39,18 @@ def _capture_api_exceptions(f):
     return wrapped
 
 
+class _Timestamp(click.ParamType):
+    name = "timestamp"
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, datetime):
+            return value
+        try:
+            return parse_timestamp(value)
+        except ValueError:
+            self.fail(f"{value!r} is not an ISO 8601 timestamp, e.g. 2023-01-01T12:00:00Z.")
+
+
 @click.group()
 def _cli():
     pass
@@ -40,11 +58,102 @@ def _cli():
 
 @_cli.command()
 @_with_app_id
+@click.option(
+    "--checkpoint/--no-checkpoint",
+    default=True,
+    help="Process only the state changes since the previous call, using the saved checkpoint.",
+)
+@click.option(
+    "--follow",
+    "-f",
+    is_flag=True,
+    default=False,
+    help="Keep running and print a JSON line each time the stats of the app or a node change.",
+)
+@click.option(
+    "--detailed",
+    is_flag=True,
+    default=False,
+    help="Include the time spent in each state, unresponsive episodes and launch time percentiles.",
+)
+@click.option(
+    "--processes",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes used to compute the stats of a large state log.",
+)
+@click.option(
+    "--since",
+    type=_Timestamp(),
+    default=None,
+    help="Only include the states from this time on (ISO 8601, UTC if no timezone is given).",
+)
+@click.option(
+    "--until",
+    type=_Timestamp(),
+    default=None,
+    help="Only include the states before this time (ISO 8601, UTC if no timezone is given).",
+)
 @_capture_api_exceptions
-def stats(*, app_id):
+def stats(
+    *,
+    app_id,
+    checkpoint: bool,
+    follow: bool,
+    detailed: bool,
+    processes: int,
+    since: Optional[datetime],
+    until: Optional[datetime],
+):
     """Return the stats of a given app."""
     dapp = DappStats(app_id)
-    print(json.dumps(dapp.get_stats(), indent=2, default=str))
+    windowed = since is not None or until is not None
+    if windowed and (follow or detailed):
+        raise click.UsageError("--since and --until can't be used with --follow or --detailed.")
+    if follow:
+        if detailed:
+            raise click.UsageError("--detailed can't be used with --follow.")
+        for update in dapp.follow_stats(checkpoint=checkpoint):
+            print(json.dumps(update, default=str), flush=True)
+    else:
+        app_stats = dapp.get_stats(
+            checkpoint=checkpoint, processes=processes, since=since, until=until
+        )
+        if detailed:
+            app_stats["detailed"] = dapp.get_detailed_stats()
+        print(json.dumps(app_stats, indent=2, default=str))
+
+
+@_cli.command()
+@click.argument("app-ids", nargs=-1, type=str)
+@click.option(
+    "--checkpoint/--no-checkpoint",
+    default=True,
+    help="Process only the state changes since the previous call, using the saved checkpoints.",
+)
+@click.option(
+    "--processes",
+    "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of processes computing the stats of the apps. [default: number of CPUs]",
+)
+@_capture_api_exceptions
+def fleet(*, app_ids: Sequence[str], checkpoint: bool, processes: Optional[int]):
+    """Return the stats aggregated over the given apps, or over all known apps if none given."""
+    fleet_stats = DappStats.fleet(app_ids or None, checkpoint=checkpoint, processes=processes)
+    print(json.dumps(fleet_stats, indent=2, default=str))
+
+
+@_cli.command()
+@_with_app_id
+@click.argument("output", type=Path)
+@_capture_api_exceptions
+def export(*, app_id, output: Path):
+    """Export the state changes of a given app as a columnar timeline (.npz) file."""
+    rows = DappStats(app_id).export_timeline(output)
+    print(json.dumps({"output": str(output), "rows": rows}, indent=2))
 
 
 @_cli.command()
@@ -54,11 +163,27 @@ def stats(*, app_id):
     required=True,
     type=Path,
 )
-def size(descriptors: Sequence[Path]):
+@click.option(
+    "--max-workers",
+    "-j",
+    type=click.IntRange(min=1),
+    default=SIZE_RESOLVER_MAX_WORKERS,
+    show_default=True,
+    help="Maximum number of payloads resolved concurrently.",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    default=False,
+    help="Ignore the cached image URLs and sizes, fetching them from the repository.",
+)
+def size(descriptors: Sequence[Path], max_workers: int, refresh: bool):
     """Calculate dApp defined payloads sizes (in bytes) on the provided set of descriptor files."""
 
     try:
-        measured_sizes, errors = DappSizeResolver.resolve_defined_payload_sizes(descriptors)
+        measured_sizes, errors = DappSizeResolver.resolve_defined_payload_sizes(
+            descriptors, max_workers=max_workers, refresh=refresh
+        )
     except DappSizeResolverError as e:
         raise ClickException(str(e))
 
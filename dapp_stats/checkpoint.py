@@ -0,0 +1,98 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+from dapp_manager.compaction import CompactState
+from dapp_manager.storage import SimpleStorage
+
+from .statistics.aggregator import StatsAggregator
+
+CHECKPOINT_VERSION = 1
+
+
+def _digest(line: Union[str, bytes]) -> str:
+    return hashlib.sha1(line.encode() if isinstance(line, str) else line).hexdigest()
+
+
+@dataclass
+class StatsCheckpoint:
+    """Statistics accumulated from the `state` stream up to the given byte offset.
+
+    The checkpoint is stored alongside the app's data, so that the following statistics queries
+    only need to process the lines appended to the `state` stream since.
+    """
+
+    aggregator: StatsAggregator = field(default_factory=StatsAggregator)
+    offset: int = 0
+    # Digest of the first line of the `state` stream, identifies the stream the checkpoint is for
+    head_digest: Optional[str] = None
+
+    @classmethod
+    def load(cls, storage: SimpleStorage) -> "StatsCheckpoint":
+        """Load the app's checkpoint, or return an empty one if there's no valid checkpoint.
+
+        A checkpoint is discarded if the `state` stream doesn't match it anymore, e.g. because the
+        stream was truncated or rewritten.
+        """
+
+        try:
+            data = json.loads(storage.read_file("stats_checkpoint"))
+            if data["version"] != CHECKPOINT_VERSION:
+                return cls()
+            checkpoint = cls(
+                aggregator=StatsAggregator.from_checkpoint(data["statistics"]),
+                offset=data["offset"],
+                head_digest=data["head_digest"],
+            )
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return cls()
+
+        if not checkpoint._matches_state_stream(storage):
+            return cls()
+
+        return checkpoint
+
+    def save(self, storage: SimpleStorage) -> None:
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "offset": self.offset,
+            "head_digest": self.head_digest,
+            "statistics": self.aggregator.to_checkpoint(),
+        }
+        storage.replace_file("stats_checkpoint", json.dumps(data))
+
+    def advance(self, raw_state: Union[str, bytes], offset: Optional[int] = None) -> None:
+        """Move the checkpoint past the given, already aggregated, `state` line.
+
+        For a compacted record, `offset` is the one following the entries collapsed into it.
+        """
+
+        if self.offset == 0:
+            self.head_digest = _digest(raw_state)
+        self.offset = offset if offset is not None else self.offset + len(raw_state)
+
+    def advance_to(self, offset: int, storage: SimpleStorage) -> None:
+        """Move the checkpoint to the given offset, following the already aggregated lines."""
+
+        if self.offset == 0:
+            with storage.open("state", "rb") as f:
+                self.head_digest = _digest(f.readline())
+        self.offset = offset
+
+    def _matches_state_stream(self, storage: SimpleStorage) -> bool:
+        compact_state = CompactState.load(storage)
+        if compact_state is not None and compact_state.source_offset:
+            return (
+                compact_state.stream_size(storage) >= self.offset
+                and compact_state.source_head_digest == self.head_digest
+            )
+
+        try:
+            with storage.open("state", "rb") as f:
+                if f.seek(0, 2) < self.offset:
+                    return False
+                f.seek(0)
+                return _digest(f.readline()) == self.head_digest
+        except FileNotFoundError:
+            return False
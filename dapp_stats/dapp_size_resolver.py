@@ -1,8 +1,11 @@
 import base64
 import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import repeat
 from pathlib import Path
-from typing import Callable, Dict, List, Sequence, Tuple, TypedDict
-from urllib import request
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypedDict
 from urllib.error import HTTPError
 
 from dapp_runner.descriptor import DappDescriptor
@@ -11,6 +14,14 @@ from dapp_runner.descriptor.parser import load_yamls
 
 from yapapi.payload.vm import _DEFAULT_REPO_SRV, resolve_repo_srv
 
+from dapp_manager import DappManager
+
+from .http_pool import HttpConnectionPool, HttpResponse
+from .payload_cache import CachedPayloadSize, PayloadSizeCache
+
+SIZE_RESOLVER_MAX_WORKERS = 8
+SIZE_RESOLVER_REQUEST_TIMEOUT = timedelta(seconds=10)
+
 
 class DappSizeResolverError(Exception):
     pass
@@ -21,30 +32,54 @@ class ResolvedPayloadSizes(TypedDict):
     payloads: Dict[str, int]
 
 
+@dataclass
+class _Resolution:
+    """Resources shared by the payloads resolved in a single call."""
+
+    cache: PayloadSizeCache
+    http: HttpConnectionPool
+
+
 class DappSizeResolver:
     @classmethod
     def resolve_defined_payload_sizes(
-        cls, descriptor_paths: Sequence[Path]
+        cls,
+        descriptor_paths: Sequence[Path],
+        *,
+        max_workers: int = SIZE_RESOLVER_MAX_WORKERS,
+        refresh: bool = False,
     ) -> Tuple[ResolvedPayloadSizes, List[str]]:
+        """Return the sizes of the payloads defined in the given descriptors and the errors.
+
+        Payloads are resolved concurrently, on a pool of at most `max_workers` threads, over
+        keep-alive connections to the repositories, each request being limited by
+        `SIZE_RESOLVER_REQUEST_TIMEOUT`. Sizes and errors are reported in the order of
+        the payloads in the descriptors.
+
+        Resolved image URLs and sizes are kept in a `PayloadSizeCache`, whose entries are ignored
+        with `refresh`.
+        """
+
         payloads_sizes = {}
         errors = []
-        size_resolvers = {
-            "vm": cls._resolve_payload_size_for_vm_runtime,
-            "vm/manifest": cls._resolve_payload_size_for_vm_manifest_runtime,
-        }
 
         dapp = cls._get_dapp_from_descriptor_paths(descriptor_paths)
-
-        for payload_name, payload in dapp.payloads.items():
-            size_resolver: Callable[[PayloadDescriptor], int] = size_resolvers.get(
-                payload.runtime, cls._resolve_payload_size_for_unknown_runtime
-            )
-
-            try:
-                payload_size = size_resolver(payload)
-            except DappSizeResolverError as e:
+        payloads = list(dapp.payloads.items())
+        cache = PayloadSizeCache.load(DappManager._get_cache_dir(), refresh=refresh)
+
+        with HttpConnectionPool(
+            timeout=SIZE_RESOLVER_REQUEST_TIMEOUT.total_seconds()
+        ) as http, ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(payloads)))
+        ) as executor:
+            resolution = _Resolution(cache, http)
+            results = list(executor.map(cls._resolve_payload_size, payloads, repeat(resolution)))
+        cache.save()
+
+        for (payload_name, _), (payload_size, error) in zip(payloads, results):
+            if error is not None:
                 errors.append(
-                    f'Ignoring payload "{payload_name}" as following error occurred:' f" {e}"
+                    f'Ignoring payload "{payload_name}" as following error occurred:' f" {error}"
                 )
             else:
                 payloads_sizes[payload_name] = payload_size
@@ -54,6 +89,24 @@ class DappSizeResolver:
             "payloads": payloads_sizes,
         }, errors
 
+    @classmethod
+    def _resolve_payload_size(
+        cls, named_payload: Tuple[str, PayloadDescriptor], resolution: _Resolution
+    ) -> Tuple[int, Optional[DappSizeResolverError]]:
+        size_resolvers = {
+            "vm": cls._resolve_payload_size_for_vm_runtime,
+            "vm/manifest": cls._resolve_payload_size_for_vm_manifest_runtime,
+        }
+        _, payload = named_payload
+        size_resolver: Callable[[PayloadDescriptor, _Resolution], int] = size_resolvers.get(
+            payload.runtime, cls._resolve_payload_size_for_unknown_runtime
+        )
+
+        try:
+            return size_resolver(payload, resolution), None
+        except DappSizeResolverError as e:
+            return 0, e
+
     @classmethod
     def _get_dapp_from_descriptor_paths(cls, descriptor_paths: Sequence[Path]) -> DappDescriptor:
         try:
@@ -67,18 +120,22 @@ class DappSizeResolver:
             raise DappSizeResolverError(f"Failed to validate descriptor files: {e}")
 
     @classmethod
-    def _resolve_payload_size_for_vm_runtime(cls, payload: PayloadDescriptor) -> int:
+    def _resolve_payload_size_for_vm_runtime(
+        cls, payload: PayloadDescriptor, resolution: _Resolution
+    ) -> int:
         try:
             image_hash = payload.params["image_hash"]
         except (TypeError, KeyError):
             raise DappSizeResolverError('Field "image_hash" is not present in payload params!')
 
-        image_url = cls._fetch_image_url_from_image_hash(image_hash)
+        image_url = cls._fetch_image_url_from_image_hash(image_hash, resolution)
 
-        return cls._fetch_payload_size_from_image_url(image_url)
+        return cls._fetch_payload_size_from_image_url(image_url, resolution)
 
     @classmethod
-    def _resolve_payload_size_for_vm_manifest_runtime(cls, payload: PayloadDescriptor) -> int:
+    def _resolve_payload_size_for_vm_manifest_runtime(
+        cls, payload: PayloadDescriptor, resolution: _Resolution
+    ) -> int:
         try:
             manifest_base64 = payload.params["manifest"]
         except KeyError:
@@ -96,42 +153,86 @@ class DappSizeResolver:
         except (KeyError, IndexError):
             raise DappSizeResolverError("Payload url is not present in manifest!")
 
-        return cls._fetch_payload_size_from_image_url(image_url)
+        return cls._fetch_payload_size_from_image_url(image_url, resolution)
 
     @classmethod
-    def _resolve_payload_size_for_unknown_runtime(cls, payload: PayloadDescriptor) -> int:
+    def _resolve_payload_size_for_unknown_runtime(
+        cls, payload: PayloadDescriptor, resolution: _Resolution
+    ) -> int:
         raise DappSizeResolverError(
             f'Size measurement for runtime "{payload.runtime}" is not supported!'
         )
 
     @classmethod
-    def _fetch_image_url_from_image_hash(cls, image_hash: str) -> str:
+    def _fetch_image_url_from_image_hash(cls, image_hash: str, resolution: _Resolution) -> str:
+        image_url = resolution.cache.image_url(image_hash)
+        if image_url is not None:
+            return image_url
+
         repo_url = resolve_repo_srv(_DEFAULT_REPO_SRV)
         repo_package_url = f"{repo_url}/image.{image_hash}.link"
 
         try:
-            return cls._fetch_http_response_body(repo_package_url).decode("utf-8")
-        except HTTPError as e:
+            response = resolution.http.request("GET", repo_package_url)
+            _raise_for_status(repo_package_url, response)
+            image_url = response.body.decode("utf-8")
+        except OSError as e:
             raise DappSizeResolverError(
                 f'Can\'t fetch image url from image hash "{image_hash}" via url'
                 f' "{repo_package_url}": {e}'
             )
 
+        resolution.cache.set_image_url(image_hash, image_url)
+        return image_url
+
     @classmethod
-    def _fetch_payload_size_from_image_url(cls, image_url: str) -> int:
+    def _fetch_payload_size_from_image_url(cls, image_url: str, resolution: _Resolution) -> int:
+        cached_size = resolution.cache.payload_size(image_url)
+        if cached_size is not None and resolution.cache.is_fresh(cached_size):
+            return cached_size.size
+
         try:
-            return int(cls._fetch_http_response_header(image_url, "Content-Length"))
-        except HTTPError as e:
+            size, etag = cls._fetch_payload_size(image_url, cached_size, resolution.http)
+        except (OSError, ValueError) as e:
             raise DappSizeResolverError(
                 f'Can\'t fetch payload size from image url "{image_url}": {e}'
             )
 
-    @classmethod
-    def _fetch_http_response_body(cls, url: str) -> bytes:
-        with request.urlopen(url) as response:
-            return response.read()
+        resolution.cache.set_payload_size(image_url, size, etag)
+        return size
 
     @classmethod
-    def _fetch_http_response_header(cls, url: str, header: str) -> bytes:
-        with request.urlopen(url) as response:
-            return response.headers[header]
+    def _fetch_payload_size(
+        cls, image_url: str, cached_size: Optional[CachedPayloadSize], http: HttpConnectionPool
+    ) -> Tuple[int, Optional[str]]:
+        """Return the size of the image and its ETag, revalidating the cached size if given.
+
+        The size is probed with a HEAD request or, if the repository doesn't support it, with
+        a request for the first byte of the image only.
+        """
+
+        etag = cached_size.etag if cached_size is not None else None
+        headers = {"If-None-Match": etag} if etag else {}
+
+        response = http.request("HEAD", image_url, headers)
+        if response.status in (405, 501) or (
+            response.status == 200 and "Content-Length" not in response.headers
+        ):
+            response = http.request("GET", image_url, {**headers, "Range": "bytes=0-0"})
+
+        if response.status == 304 and cached_size is not None:
+            # Not modified since the cached size was fetched
+            return cached_size.size, etag
+        _raise_for_status(image_url, response)
+
+        if response.status == 206:
+            # Content-Range: bytes 0-0/<size>
+            size = int(response.headers.get("Content-Range", "").rpartition("/")[2])
+        else:
+            size = int(response.headers.get("Content-Length", ""))
+        return size, response.headers.get("ETag")
+
+
+def _raise_for_status(url: str, response: HttpResponse) -> None:
+    if not 200 <= response.status < 300:
+        raise HTTPError(url, response.status, response.reason, response.headers, None)
@@ -1,51 +1,343 @@
-from collections import defaultdict
-from typing import DefaultDict, Dict, Optional
+import os
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import sleep
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 import pydantic
 
 from dapp_manager import DappManager
+from dapp_manager.compaction import CompactState
+from dapp_manager.exceptions import DappManagerException
+from dapp_manager.storage import SimpleStorage
 
+from .checkpoint import StatsCheckpoint
 from .exceptions import DappStatsException
-from .statistics.models import NodeStatistics
+from .statistics.aggregator import StatisticsKey, StatsAggregator
+from .statistics.fleet import FleetStats
+from .statistics.parallel import summarize_state_file
+from .statistics.parser import StateLogParser
 from .statistics.schemas import StateLogEntry
+from .statistics.window import seek_timestamp
+from .timeline import StateTimeline
+
+STATS_FOLLOW_INTERVAL = timedelta(milliseconds=500)
 
 
 class DappStats:
     def __init__(self, app_id: str):
         self._app_id = app_id
 
-    def _iter_app_states(self):
-        return DappManager(self._app_id).storage.iter_file_lines("state")
+    @property
+    def _storage(self) -> SimpleStorage:
+        return DappManager(self._app_id).storage
 
-    def get_stats(self) -> Dict:
-        nodes_stats: DefaultDict[str, Dict[int, NodeStatistics]] = defaultdict(dict)
-        app_statistics: Optional[NodeStatistics] = None
+    def _iter_app_states(self, start_pos: int = 0) -> Iterator[bytes]:
+        return self._storage.iter_file_raw_lines("state", start_pos=start_pos)
 
-        for raw_state in self._iter_app_states():
-            try:
-                app_state = StateLogEntry.parse_raw(raw_state)
-            except pydantic.ValidationError:
-                raise DappStatsException(
-                    f"dApp {self._app_id } state log is corrupted. Unable to generate statistics."
+    def _iter_app_state_entries(
+        self, start_pos: int = 0, compact_state: Optional[CompactState] = None
+    ) -> Iterator[Tuple[bytes, int]]:
+        """Yield the entries of the `state` stream, with the stream offsets following them.
+
+        If the stream is compacted, the entries are its run-length records followed by the lines
+        appended since the compaction.
+        """
+
+        if compact_state is not None:
+            yield from compact_state.iter_entries(self._storage, start_pos)
+            return
+
+        for raw_state in self._iter_app_states(start_pos):
+            start_pos += len(raw_state)
+            yield raw_state, start_pos
+
+    def get_stats(
+        self,
+        *,
+        checkpoint: bool = True,
+        processes: int = 1,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict:
+        """Return the statistics of the app and its nodes.
+
+        With `checkpoint` enabled, the statistics are computed incrementally - only the `state`
+        lines appended since the previous call are processed and the accumulated statistics are
+        saved alongside the app for the next call.
+
+        With `processes` > 1, large parts of the `state` stream are split into ranges summarized
+        on a pool of worker processes.
+
+        With `since` and/or `until`, the statistics cover only the `state` lines from the given
+        time window - `since` inclusive, `until` exclusive, naive datetimes are treated as UTC.
+        The window is located without scanning the stream from the start and the statistics of
+        a window are never checkpointed.
+        """
+
+        if since is not None or until is not None:
+            return self._aggregate_window(since, until, processes=processes).to_dict()
+        return self._aggregate(checkpoint=checkpoint, processes=processes).to_dict()
+
+    def export_timeline(self, path: Union[str, Path]) -> int:
+        """Export the app's `state` stream as a `StateTimeline` file, return its row count."""
+
+        entries = self._iter_app_state_entries(0, CompactState.load(self._storage))
+        return StateTimeline.export((raw_state for raw_state, _ in entries), path)
+
+    def get_detailed_stats(self) -> Dict:
+        """Return the detailed statistics of the app's nodes and services.
+
+        See `StateTimeline.metrics` - the `state` stream is exported to a temporary timeline file,
+        which is then memory-mapped for the computation.
+        """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            timeline_file = Path(tmp_dir) / "timeline.npz"
+            self.export_timeline(timeline_file)
+            return StateTimeline.load(timeline_file).metrics()
+
+    @classmethod
+    def fleet(
+        cls,
+        app_ids: Optional[Sequence[str]] = None,
+        *,
+        checkpoint: bool = True,
+        processes: Optional[int] = None,
+    ) -> Dict:
+        """Return the statistics aggregated over the given apps, or over all known apps.
+
+        The statistics of the apps are computed on a pool of `processes` worker processes
+        (by default, one per CPU), each using the app's checkpoint as in `get_stats`.
+        Apps whose statistics can't be computed are reported in the `errors` of the result.
+        """
+
+        if app_ids is None:
+            app_ids = DappManager.list()
+        processes = min(processes or os.cpu_count() or 1, len(app_ids))
+
+        results: Iterable[Tuple[str, Optional[StatsAggregator], Optional[str]]]
+        if processes > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = list(
+                    executor.map(
+                        _get_app_aggregator,
+                        app_ids,
+                        [checkpoint] * len(app_ids),
+                        chunksize=max(1, len(app_ids) // (processes * 4)),
+                    )
                 )
+        else:
+            results = (_get_app_aggregator(app_id, checkpoint) for app_id in app_ids)
 
-            if app_statistics is not None:
-                app_statistics += NodeStatistics(state=app_state.app, timestamp=app_state.timestamp)
+        fleet_stats = FleetStats()
+        for app_id, aggregator, error in results:
+            if aggregator is not None:
+                fleet_stats.add(aggregator)
             else:
-                app_statistics = NodeStatistics(state=app_state.app, timestamp=app_state.timestamp)
+                fleet_stats.add_error(app_id, error or "")
+        return fleet_stats.to_dict()
+
+    def _aggregate(self, *, checkpoint: bool, processes: int = 1) -> StatsAggregator:
+        stats_checkpoint = StatsCheckpoint.load(self._storage) if checkpoint else StatsCheckpoint()
+        initial_offset = stats_checkpoint.offset
+
+        if processes > 1:
+            compact_state = CompactState.load(self._storage)
+            if compact_state is not None:
+                # Compacted records are few, only the lines following them are worth splitting
+                for _ in self._process_new_states(
+                    stats_checkpoint,
+                    StateLogParser(),
+                    track_changes=False,
+                    end=compact_state.source_offset,
+                ):
+                    pass
+            self._process_new_states_parallel(
+                stats_checkpoint,
+                processes,
+                base=compact_state.state_base if compact_state is not None else 0,
+            )
+
+        # Lines appended in the meantime, or all of them if not processed in parallel
+        for _ in self._process_new_states(stats_checkpoint, StateLogParser(), track_changes=False):
+            pass
+
+        if checkpoint and stats_checkpoint.offset != initial_offset:
+            stats_checkpoint.save(self._storage)
+
+        return stats_checkpoint.aggregator
+
+    def _aggregate_window(
+        self, since: Optional[datetime], until: Optional[datetime], *, processes: int = 1
+    ) -> StatsAggregator:
+        compact_state = CompactState.load(self._storage)
+        if compact_state is not None and compact_state.state_base:
+            raise DappStatsException(
+                f"dApp {self._app_id} state log was compacted and its original removed."
+                " Unable to generate statistics of a time window."
+            )
+
+        try:
+            with self._storage.open("state", "rb") as f:
+                end = f.seek(0, 2)
+                start = seek_timestamp(f, since, 0, end) if since is not None else 0
+                if until is not None:
+                    end = seek_timestamp(f, until, start, end)
+        except FileNotFoundError:
+            return StatsAggregator()
+        except ValueError:
+            raise self._state_log_corrupted()
 
-            for node, node_states in app_state.nodes.items():
-                for node_idx, state in node_states.items():
-                    node_stat = NodeStatistics(state=state, timestamp=app_state.timestamp)
-                    if node_idx in nodes_stats[node]:
-                        nodes_stats[node][node_idx] += node_stat
-                    else:
-                        nodes_stats[node][node_idx] = node_stat
+        stats_checkpoint = StatsCheckpoint(offset=start)
+        if processes > 1:
+            self._process_new_states_parallel(stats_checkpoint, processes, end=end)
+        for _ in self._process_new_states(
+            stats_checkpoint, StateLogParser(), track_changes=False, end=end
+        ):
+            pass
 
+        return stats_checkpoint.aggregator
+
+    def follow_stats(self, *, checkpoint: bool = True) -> Iterator[Dict]:
+        """Continuously yield the statistics of the app and its nodes as they change.
+
+        First, the current statistics of the app and all of its nodes are yielded. Then, the
+        `state` stream is followed and an update is yielded each time a line changes the
+        statistics of the app or of a node. Updates are in the form of:
+            {"node": "db", "index": 0, "timestamp": ..., "statistics": {...}}
+        where `node` and `index` are None for the app itself and `timestamp`
+        is the one of the `state` line that caused the change (None in the initial statistics).
+
+        Yielding ends once the app is no longer running and its whole `state` stream is processed.
+        """
+
+        stats_checkpoint = StatsCheckpoint.load(self._storage) if checkpoint else StatsCheckpoint()
+        aggregator = stats_checkpoint.aggregator
+        parser = StateLogParser()
+        saved_offset = stats_checkpoint.offset if checkpoint else None
+
+        for _ in self._process_new_states(stats_checkpoint, parser, track_changes=False):
+            pass
+        for key in aggregator.keys():
+            yield self._stats_update(aggregator, key, None)
+
+        while True:
+            # Checked before reading, so that the lines written just before the app stopped
+            # are still processed
+            alive = DappManager(self._app_id).alive
+
+            for changed, app_state in self._process_new_states(stats_checkpoint, parser):
+                for key in changed or ():
+                    yield self._stats_update(aggregator, key, app_state.timestamp)
+
+            if checkpoint and stats_checkpoint.offset != saved_offset:
+                stats_checkpoint.save(self._storage)
+                saved_offset = stats_checkpoint.offset
+
+            if not alive:
+                return
+
+            sleep(STATS_FOLLOW_INTERVAL.total_seconds())
+
+    def _process_new_states_parallel(
+        self,
+        stats_checkpoint: StatsCheckpoint,
+        processes: int,
+        *,
+        end: Optional[int] = None,
+        base: int = 0,
+    ) -> None:
+        """Aggregate the `state` file following the checkpoint on a pool of worker processes.
+
+        `base` is the offset in the `state` stream of the start of the file, see `CompactState`.
+        """
+
+        state_file = self._storage.file_name("state")
+        if end is None:
+            try:
+                end = base + state_file.stat().st_size
+            except FileNotFoundError:
+                return
+        if stats_checkpoint.offset < base:
+            return
+
+        try:
+            result = summarize_state_file(
+                state_file, stats_checkpoint.offset - base, end - base, processes
+            )
+        except ValueError:
+            raise self._state_log_corrupted()
+        if result is None:
+            return
+
+        summary, offset = result
+        stats_checkpoint.aggregator.extend(summary)
+        stats_checkpoint.advance_to(base + offset, self._storage)
+
+    def _process_new_states(
+        self,
+        stats_checkpoint: StatsCheckpoint,
+        parser: StateLogParser,
+        *,
+        track_changes: bool = True,
+        end: Optional[int] = None,
+    ) -> Iterator[Tuple[Optional[List[StatisticsKey]], StateLogEntry]]:
+        """Aggregate the `state` lines following the checkpoint, advancing it.
+
+        Yields each parsed line, together with the keys of the statistics it changed if
+        `track_changes` is enabled. Stops at the `end` offset, if given.
+        """
+
+        compact_state = CompactState.load(self._storage)
+        for raw_state, offset in self._iter_app_state_entries(
+            stats_checkpoint.offset, compact_state
+        ):
+            if end is not None and stats_checkpoint.offset >= end:
+                return
+            try:
+                app_state = parser.parse(raw_state)
+            except pydantic.ValidationError:
+                raise self._state_log_corrupted()
+
+            changed: Optional[List[StatisticsKey]] = [] if track_changes else None
+            stats_checkpoint.aggregator.add(app_state, changed)
+            is_first = stats_checkpoint.offset == 0
+            stats_checkpoint.advance(raw_state, offset)
+            if is_first and compact_state is not None and compact_state.source_offset:
+                # The first entry is a compacted record, the stream is identified by its first line
+                stats_checkpoint.head_digest = compact_state.source_head_digest
+            yield changed, app_state
+
+    def _state_log_corrupted(self) -> DappStatsException:
+        return DappStatsException(
+            f"dApp {self._app_id } state log is corrupted. Unable to generate statistics."
+        )
+
+    @staticmethod
+    def _stats_update(
+        aggregator: StatsAggregator, key: StatisticsKey, timestamp: Optional[datetime]
+    ) -> Dict:
+        node, node_idx = key
+        node_stats = aggregator.get(key)
         return {
-            "app": app_statistics.to_dict() if app_statistics is not None else {},
-            "nodes": {
-                node: {idx: idx_stat.to_dict() for idx, idx_stat in node_stats.items()}
-                for node, node_stats in nodes_stats.items()
-            },
+            "node": node,
+            "index": node_idx,
+            "timestamp": timestamp,
+            "state": node_stats.state if node_stats is not None else None,
+            "statistics": node_stats.to_dict() if node_stats is not None else {},
         }
+
+
+def _get_app_aggregator(
+    app_id: str, checkpoint: bool
+) -> Tuple[str, Optional[StatsAggregator], Optional[str]]:
+    """Return the statistics of a single app of the fleet, or the error message."""
+
+    try:
+        return app_id, DappStats(app_id)._aggregate(checkpoint=checkpoint), None
+    except (DappStatsException, DappManagerException) as e:
+        return app_id, None, str(e)
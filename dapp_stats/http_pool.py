@@ -0,0 +1,127 @@
+import http.client
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple
+from urllib.error import URLError
+from urllib.parse import urljoin, urlsplit
+
+HTTP_MAX_REDIRECTS = 5
+# Larger response bodies aren't read, their connections are closed instead of being reused
+HTTP_MAX_BODY_SIZE = 64 * 1024
+
+_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+_RETRIED_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+_ConnectionKey = Tuple[str, str, Optional[int]]
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    reason: str
+    headers: http.client.HTTPMessage
+    body: bytes
+
+
+class HttpConnectionPool:
+    """Keep-alive HTTP(S) connections, reused by the requests to the same host.
+
+    Safe to use from multiple threads - each request takes an idle connection to its host (or opens
+    a new one) and returns it to the pool once the response is consumed. Redirects are followed.
+    """
+
+    def __init__(self, *, timeout: float):
+        self.timeout = timeout
+        self._idle: Dict[_ConnectionKey, List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "HttpConnectionPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def request(
+        self, method: str, url: str, headers: Optional[Mapping[str, str]] = None
+    ) -> HttpResponse:
+        """Send the request and return its response, following redirects.
+
+        The body of the response is read only if it's not larger than `HTTP_MAX_BODY_SIZE`.
+        Raises `OSError` (e.g. `URLError`, `TimeoutError`) on failures below the HTTP level.
+        """
+
+        for _ in range(HTTP_MAX_REDIRECTS + 1):
+            response = self._request_once(method, url, headers or {})
+            location = response.headers.get("Location")
+            if response.status not in _REDIRECT_STATUSES or location is None:
+                return response
+            url = urljoin(url, location)
+
+        raise URLError(f"Too many redirects, last one to {url}")
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def _request_once(self, method: str, url: str, headers: Mapping[str, str]) -> HttpResponse:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise URLError(f"unknown url type: {url!r}")
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        connection, reused = self._acquire(key)
+        try:
+            try:
+                connection.request(method, path, headers=headers)
+                response = connection.getresponse()
+            except _RETRIED_ERRORS:
+                if not reused:
+                    raise
+                # The idle connection was closed by the server in the meantime
+                connection.close()
+                connection, _ = self._acquire(key, reuse=False)
+                connection.request(method, path, headers=headers)
+                response = connection.getresponse()
+
+            body = b""
+            length = response.getheader("Content-Length")
+            if (
+                method == "HEAD"
+                or response.status in (204, 304)
+                or (length is not None and int(length) <= HTTP_MAX_BODY_SIZE)
+            ):
+                body = response.read()
+            if response.isclosed() and not response.will_close:
+                self._release(key, connection)
+            else:
+                connection.close()
+        except BaseException:
+            connection.close()
+            raise
+
+        return HttpResponse(response.status, response.reason, response.headers, body)
+
+    def _acquire(
+        self, key: _ConnectionKey, *, reuse: bool = True
+    ) -> Tuple[http.client.HTTPConnection, bool]:
+        if reuse:
+            with self._lock:
+                connections = self._idle.get(key)
+                if connections:
+                    return connections.pop(), True
+
+        scheme, host, port = key
+        connection_class = (
+            http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        )
+        return connection_class(host, port, timeout=self.timeout), False
+
+    def _release(self, key: _ConnectionKey, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._idle.setdefault(key, []).append(connection)
@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from pathlib import Path
+from time import time
+from typing import Dict, Optional
+
+PAYLOAD_CACHE_VERSION = 1
+# Time after which a cached payload size is revalidated with the repository
+PAYLOAD_SIZE_TTL = timedelta(days=1)
+
+
+@dataclass
+class CachedPayloadSize:
+    size: int
+    etag: Optional[str]
+    # Time of the last validation of the size with the repository, in seconds since the epoch
+    checked_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time() - self.checked_at < PAYLOAD_SIZE_TTL.total_seconds()
+
+
+class PayloadSizeCache:
+    """On-disk cache of the payload size resolution, kept in the user cache dir.
+
+    Image hashes are content addresses, so the image hash -> image URL mapping never changes and is
+    cached for good. The size of an image URL is reused for `PAYLOAD_SIZE_TTL`, then revalidated
+    with a conditional request, using the ETag of the previous response if there was one.
+
+    With `refresh`, the cached entries are ignored (but ETags are still used for revalidation)
+    and overwritten with the fetched ones.
+    """
+
+    def __init__(self, cache_dir: str, *, refresh: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.refresh = refresh
+        self._image_urls: Dict[str, str] = {}
+        self._payload_sizes: Dict[str, CachedPayloadSize] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    @property
+    def cache_file(self) -> Path:
+        return self.cache_dir / "payload_sizes.json"
+
+    @classmethod
+    def load(cls, cache_dir: str, *, refresh: bool = False) -> "PayloadSizeCache":
+        """Load the cache from the given dir, starting with an empty one if there's no valid one."""
+
+        cache = cls(cache_dir, refresh=refresh)
+        try:
+            with cache.cache_file.open("r") as f:
+                data = json.load(f)
+            if data["version"] == PAYLOAD_CACHE_VERSION:
+                cache._image_urls = dict(data["image_urls"])
+                cache._payload_sizes = {
+                    image_url: CachedPayloadSize(**entry)
+                    for image_url, entry in data["payload_sizes"].items()
+                }
+        except (OSError, ValueError, KeyError, TypeError):
+            cache._image_urls, cache._payload_sizes = {}, {}
+        return cache
+
+    def image_url(self, image_hash: str) -> Optional[str]:
+        return None if self.refresh else self._image_urls.get(image_hash)
+
+    def set_image_url(self, image_hash: str, image_url: str) -> None:
+        with self._lock:
+            self._image_urls[image_hash] = image_url
+            self._dirty = True
+
+    def payload_size(self, image_url: str) -> Optional[CachedPayloadSize]:
+        """Return the cached size of the image URL, to be revalidated unless `fresh`."""
+
+        return self._payload_sizes.get(image_url)
+
+    def set_payload_size(self, image_url: str, size: int, etag: Optional[str]) -> None:
+        with self._lock:
+            self._payload_sizes[image_url] = CachedPayloadSize(size, etag, time())
+            self._dirty = True
+
+    def is_fresh(self, cached_size: CachedPayloadSize) -> bool:
+        return not self.refresh and cached_size.fresh
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+
+        with self._lock:
+            data = {
+                "version": PAYLOAD_CACHE_VERSION,
+                "image_urls": self._image_urls,
+                "payload_sizes": {
+                    image_url: asdict(entry) for image_url, entry in self._payload_sizes.items()
+                },
+            }
+            self._dirty = False
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
+            with tmp_file.open("w") as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            # The cache is only an optimization, sizes are resolved without it
+            pass
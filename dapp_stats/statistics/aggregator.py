@@ -0,0 +1,112 @@
+import sys
+from collections import defaultdict
+from typing import DefaultDict, Dict, List, Optional, Tuple
+
+from dapp_stats.statistics.models import NodeStatistics
+from dapp_stats.statistics.schemas import StateLogEntry
+from dapp_stats.statistics.summary import StatsSummary
+
+# Key of a single node's statistics - (node name, node index), or (None, None) for the app
+StatisticsKey = Tuple[Optional[str], Optional[int]]
+APP_KEY: StatisticsKey = (None, None)
+
+
+class StatsAggregator:
+    """Statistics of an app and its nodes, accumulated from the consecutive `state` entries."""
+
+    def __init__(self):
+        self.app: Optional[NodeStatistics] = None
+        self.nodes: DefaultDict[str, Dict[int, NodeStatistics]] = defaultdict(dict)
+
+    def add(self, app_state: StateLogEntry, changed: Optional[List[StatisticsKey]] = None) -> None:
+        """Add the `state` entry to the statistics.
+
+        If the `changed` list is given, the keys of the statistics changed by the entry are
+        appended to it.
+        """
+
+        timestamp = app_state.timestamp
+        if self.app is None:
+            self.app = NodeStatistics(timestamp=timestamp, state=app_state.app)
+            if changed is not None:
+                changed.append(APP_KEY)
+        elif self.app.update(app_state.app, timestamp) and changed is not None:
+            changed.append(APP_KEY)
+
+        nodes = self.nodes
+        for node, node_states in app_state.nodes.items():
+            node_stats = nodes.get(node)
+            if node_stats is None:
+                # Node names are repeated in each of the entries, keep a single copy
+                node = sys.intern(node)
+                node_stats = nodes[node] = {}
+
+            for node_idx, state in node_states.items():
+                idx_stats = node_stats.get(node_idx)
+                if idx_stats is None:
+                    node_stats[node_idx] = NodeStatistics(timestamp=timestamp, state=state)
+                    if changed is not None:
+                        changed.append((node, node_idx))
+                elif idx_stats.update(state, timestamp) and changed is not None:
+                    changed.append((node, node_idx))
+
+    def extend(self, summary: StatsSummary) -> None:
+        """Fold the summary of the `state` entries directly following the added ones."""
+
+        if summary.app is not None:
+            if self.app is not None:
+                self.app.extend(summary.app)
+            else:
+                self.app = NodeStatistics.from_summary(summary.app)
+
+        for node, node_summaries in summary.nodes.items():
+            for node_idx, node_summary in node_summaries.items():
+                if node_idx in self.nodes[node]:
+                    self.nodes[node][node_idx].extend(node_summary)
+                else:
+                    self.nodes[node][node_idx] = NodeStatistics.from_summary(node_summary)
+
+    def get(self, key: StatisticsKey) -> Optional[NodeStatistics]:
+        node, node_idx = key
+        if node is None:
+            return self.app
+        return self.nodes.get(node, {}).get(node_idx)  # type: ignore [arg-type]
+
+    def keys(self) -> List[StatisticsKey]:
+        keys: List[StatisticsKey] = [APP_KEY] if self.app is not None else []
+        keys.extend(
+            (node, node_idx) for node, node_stats in self.nodes.items() for node_idx in node_stats
+        )
+        return keys
+
+    def to_dict(self) -> Dict:
+        return {
+            "app": self.app.to_dict() if self.app is not None else {},
+            "nodes": {
+                node: {idx: idx_stat.to_dict() for idx, idx_stat in node_stats.items()}
+                for node, node_stats in self.nodes.items()
+            },
+        }
+
+    def to_checkpoint(self) -> Dict:
+        """Return a JSON-serializable representation of the aggregated statistics."""
+
+        return {
+            "app": self.app.to_checkpoint() if self.app is not None else None,
+            "nodes": {
+                node: {str(idx): idx_stat.to_checkpoint() for idx, idx_stat in node_stats.items()}
+                for node, node_stats in self.nodes.items()
+            },
+        }
+
+    @classmethod
+    def from_checkpoint(cls, data: Dict) -> "StatsAggregator":
+        aggregator = cls()
+        if data["app"] is not None:
+            aggregator.app = NodeStatistics.from_checkpoint(data["app"])
+        for node, node_stats in data["nodes"].items():
+            aggregator.nodes[node] = {
+                int(idx): NodeStatistics.from_checkpoint(idx_stat)
+                for idx, idx_stat in node_stats.items()
+            }
+        return aggregator
@@ -0,0 +1,75 @@
+from collections import Counter
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from dapp_stats.statistics.aggregator import StatsAggregator
+from dapp_stats.statistics.models import NodeStatistics
+
+FLEET_PERCENTILES = (50, 90, 99)
+
+
+def percentile(values: Sequence[timedelta], q: float) -> timedelta:
+    """Return the q-th percentile of the sorted values, interpolated linearly between them."""
+
+    rank = (len(values) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def distribution(values: Iterable[timedelta]) -> Optional[Dict]:
+    """Return the summary of the distribution of the given durations, None if there are none."""
+
+    sorted_values = sorted(values)
+    if not sorted_values:
+        return None
+
+    return {
+        "count": len(sorted_values),
+        "min": sorted_values[0],
+        "mean": sum(sorted_values, timedelta()) / len(sorted_values),
+        **{f"p{q}": percentile(sorted_values, q) for q in FLEET_PERCENTILES},
+        "max": sorted_values[-1],
+    }
+
+
+class FleetStats:
+    """Aggregated statistics of multiple apps - over the apps and over all of their nodes."""
+
+    def __init__(self):
+        self.apps: List[NodeStatistics] = []
+        self.nodes: List[NodeStatistics] = []
+        self.errors: Dict[str, str] = {}
+
+    def add(self, aggregator: StatsAggregator) -> None:
+        if aggregator.app is not None:
+            self.apps.append(aggregator.app)
+        for node_stats in aggregator.nodes.values():
+            self.nodes.extend(node_stats.values())
+
+    def add_error(self, app_id: str, message: str) -> None:
+        self.errors[app_id] = message
+
+    def to_dict(self) -> Dict:
+        return {
+            "apps": self._summarize(self.apps),
+            "nodes": self._summarize(self.nodes),
+            "errors": self.errors,
+        }
+
+    @staticmethod
+    def _summarize(stats: List[NodeStatistics]) -> Dict:
+        launched = [node_stats for node_stats in stats if node_stats._launched_successfully]
+        return {
+            "count": len(stats),
+            "launch_success_rate": len(launched) / len(stats) if stats else None,
+            "time_to_launch": distribution(
+                node_stats._time_to_launch for node_stats in launched  # type: ignore [misc]
+            ),
+            "working_time": distribution(
+                node_stats._working_time
+                for node_stats in stats
+                if node_stats._working_time is not None
+            ),
+            "states": dict(Counter(node_stats.state.value for node_stats in stats)),
+        }
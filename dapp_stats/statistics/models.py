@@ -1,33 +1,143 @@
-from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
 from dapp_stats.statistics.enums import NodeState
 
+if TYPE_CHECKING:  # pragma: no cover
+    from dapp_stats.statistics.summary import NodeSummary
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
 
-@dataclass
 class NodeStatistics:
-    timestamp: datetime
-    state: NodeState
-    _changes: int = 1
-    _launched_successfully: bool = False
-    _terminated: bool = False
-    _time_to_launch: Optional[timedelta] = None
-    _working_time: Optional[timedelta] = None
-
-    def __add__(self, other):
-        time_since_first_stat = other.timestamp - self.timestamp
-        if self.state != other.state:
-            self.state = other.state
-            self._changes += 1
-            if self.state == NodeState.running:
-                self._launched_successfully = True
-                self._time_to_launch = time_since_first_stat
-            if self.state == NodeState.terminated:
-                self._terminated = True
-                self._working_time = time_since_first_stat
+    """Statistics of a single node (or of the app), folded over its consecutive states.
+
+    As there may be millions of the states for thousands of nodes, the statistics are kept
+    compact - in slots, with the timestamps and durations as integer microseconds - and updated
+    in place, without allocating anything unless the state of the node changes.
+    """
+
+    __slots__ = (
+        "state",
+        "_changes",
+        "_launched_successfully",
+        "_terminated",
+        # Timestamp of the first state, in microseconds since the epoch, and its timezone
+        "_timestamp_us",
+        "_tzinfo",
+        "_time_to_launch_us",
+        "_working_time_us",
+    )
+
+    def __init__(
+        self,
+        timestamp: datetime,
+        state: NodeState,
+        _changes: int = 1,
+        _launched_successfully: bool = False,
+        _terminated: bool = False,
+        _time_to_launch: Optional[timedelta] = None,
+        _working_time: Optional[timedelta] = None,
+    ):
+        self.state = state
+        self._changes = _changes
+        self._launched_successfully = _launched_successfully
+        self._terminated = _terminated
+        self._timestamp_us = _to_epoch_microseconds(timestamp)
+        self._tzinfo: Optional[tzinfo] = timestamp.tzinfo
+        self._time_to_launch_us = _to_microseconds(_time_to_launch)
+        self._working_time_us = _to_microseconds(_working_time)
+
+    @property
+    def timestamp(self) -> datetime:
+        """Timestamp of the first state of the node."""
+
+        if self._tzinfo is None:
+            return _NAIVE_EPOCH + timedelta(microseconds=self._timestamp_us)
+        return (_EPOCH + timedelta(microseconds=self._timestamp_us)).astimezone(self._tzinfo)
+
+    @property
+    def _time_to_launch(self) -> Optional[timedelta]:
+        return _from_microseconds(self._time_to_launch_us)
+
+    @property
+    def _working_time(self) -> Optional[timedelta]:
+        return _from_microseconds(self._working_time_us)
+
+    def update(self, state: NodeState, timestamp: datetime) -> bool:
+        """Fold the next state of the node into the statistics, return True if it changed them."""
+
+        if state == self.state:
+            return False
+
+        self.state = state
+        self._changes += 1
+        if state == NodeState.running:
+            self._launched_successfully = True
+            self._time_to_launch_us = _to_epoch_microseconds(timestamp) - self._timestamp_us
+        elif state == NodeState.terminated:
+            self._terminated = True
+            self._working_time_us = _to_epoch_microseconds(timestamp) - self._timestamp_us
+        return True
+
+    def __add__(self, other: "NodeStatistics") -> "NodeStatistics":
+        if other.state != self.state:
+            self.update(other.state, other.timestamp)
+        return self
+
+    def extend(self, summary: "NodeSummary") -> "NodeStatistics":
+        """Fold the summary of the states directly following the current one into the statistics.
+
+        The result is the same as the one of adding each of the summarized states in order.
+        """
+
+        self.update(summary.first_state, summary.first_timestamp)
+
+        self.state = summary.last_state
+        self._changes += summary.changes
+        if summary.running_at is not None:
+            self._launched_successfully = True
+            self._time_to_launch_us = (
+                _to_epoch_microseconds(summary.running_at) - self._timestamp_us
+            )
+        if summary.terminated_at is not None:
+            self._terminated = True
+            self._working_time_us = (
+                _to_epoch_microseconds(summary.terminated_at) - self._timestamp_us
+            )
         return self
 
+    @classmethod
+    def from_summary(cls, summary: "NodeSummary") -> "NodeStatistics":
+        return cls(timestamp=summary.first_timestamp, state=summary.first_state).extend(summary)
+
+    def to_checkpoint(self) -> Dict:
+        """Return a JSON-serializable representation of the full statistics state."""
+
+        return {
+            "timestamp": self.timestamp.isoformat(),
+            "state": self.state.value,
+            "changes": self._changes,
+            "launched_successfully": self._launched_successfully,
+            "terminated": self._terminated,
+            "time_to_launch": self._time_to_launch_us,
+            "working_time": self._working_time_us,
+        }
+
+    @classmethod
+    def from_checkpoint(cls, data: Dict) -> "NodeStatistics":
+        return cls(
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            state=NodeState(data["state"]),
+            _changes=data["changes"],
+            _launched_successfully=data["launched_successfully"],
+            _terminated=data["terminated"],
+            _time_to_launch=_from_microseconds(data["time_to_launch"]),
+            _working_time=_from_microseconds(data["working_time"]),
+        )
+
     def to_dict(self) -> Dict:
         return {
             "state_changes": self._changes,
@@ -36,3 +146,41 @@ class NodeStatistics:
             "terminated": self._terminated,
             "working_time": self._working_time,
         }
+
+    def _key(self) -> Tuple:
+        return (
+            self.state,
+            self._changes,
+            self._launched_successfully,
+            self._terminated,
+            self._timestamp_us,
+            self._tzinfo is None,
+            self._time_to_launch_us,
+            self._working_time_us,
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, NodeStatistics):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __repr__(self) -> str:
+        return (
+            f"NodeStatistics(timestamp={self.timestamp!r}, state={self.state!r},"
+            f" _changes={self._changes!r}, _launched_successfully={self._launched_successfully!r},"
+            f" _terminated={self._terminated!r}, _time_to_launch={self._time_to_launch!r},"
+            f" _working_time={self._working_time!r})"
+        )
+
+
+def _to_epoch_microseconds(timestamp: datetime) -> int:
+    epoch = _NAIVE_EPOCH if timestamp.tzinfo is None else _EPOCH
+    return (timestamp - epoch) // _MICROSECOND
+
+
+def _to_microseconds(value: Optional[timedelta]) -> Optional[int]:
+    return value // _MICROSECOND if value is not None else None
+
+
+def _from_microseconds(value: Optional[int]) -> Optional[timedelta]:
+    return timedelta(microseconds=value) if value is not None else None
@@ -0,0 +1,79 @@
+from functools import reduce
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pydantic
+
+from dapp_stats.statistics.parser import StateLogParser
+from dapp_stats.statistics.summary import StatsSummary
+
+# Smaller ranges are not worth the overhead of a worker process
+PARALLEL_MIN_RANGE_SIZE = 4 * 2**20
+
+
+def split_state_file(path: Path, start: int, end: int, ranges: int) -> List[Tuple[int, int]]:
+    """Split the given part of the `state` stream into at most `ranges` newline-aligned ranges."""
+
+    ranges = max(1, min(ranges, (end - start) // PARALLEL_MIN_RANGE_SIZE))
+    boundaries = [start]
+    with path.open("rb") as f:
+        for i in range(1, ranges):
+            # Seek one byte back, so that a boundary already at the start of a line is kept
+            f.seek(start + (end - start) * i // ranges - 1)
+            f.readline()
+            boundary = f.tell()
+            if boundaries[-1] < boundary < end:
+                boundaries.append(boundary)
+    boundaries.append(end)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def summarize_state_range(path: Path, start: int, end: int) -> Tuple[StatsSummary, int]:
+    """Summarize the complete `state` lines starting within the given range.
+
+    Returns the summary and the offset following the last summarized line. Runs in a worker
+    process, so the errors are reported as a plain `ValueError`.
+    """
+
+    summary = StatsSummary()
+    parser = StateLogParser()
+    pos = start
+    with path.open("rb") as f:
+        f.seek(start)
+        for line in f:
+            if pos >= end or not line.endswith(b"\n"):
+                break
+            try:
+                summary.add(parser.parse(line))
+            except pydantic.ValidationError:
+                raise ValueError(f"Invalid state line at offset {pos}")
+            pos += len(line)
+    return summary, pos
+
+
+def summarize_state_file(
+    path: Path, start: int, end: int, processes: int
+) -> Optional[Tuple[StatsSummary, int]]:
+    """Summarize the given part of the `state` stream on a pool of worker processes.
+
+    Returns None if the part is too small to be processed in parallel.
+    """
+
+    ranges = split_state_file(path, start, end, processes)
+    if len(ranges) < 2:
+        return None
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        results = list(
+            executor.map(
+                summarize_state_range,
+                [path] * len(ranges),
+                [range_start for range_start, _ in ranges],
+                [range_end for _, range_end in ranges],
+            )
+        )
+
+    summary = reduce(StatsSummary.merge, (range_summary for range_summary, _ in results))
+    return summary, results[-1][1]
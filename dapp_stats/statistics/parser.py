@@ -0,0 +1,88 @@
+import json
+from datetime import datetime
+from typing import Dict, Union
+
+from dapp_stats.statistics.enums import NodeState
+from dapp_stats.statistics.schemas import StateLogEntry
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover
+    _json_loads = json.loads
+
+_NODE_STATES: Dict[str, NodeState] = {state.value: state for state in NodeState}
+_NODE_INDEXES: Dict[str, int] = {str(idx): idx for idx in range(1024)}
+
+
+def _parse_node_index(value: str) -> int:
+    try:
+        return _NODE_INDEXES[value]
+    except KeyError:
+        return int(value)
+
+
+def parse_timestamp(value: str) -> datetime:
+    # `fromisoformat` doesn't accept the `Z` suffix before python 3.11
+    if value[-1] == "Z":
+        value = f"{value[:-1]}+00:00"
+    return datetime.fromisoformat(value)
+
+
+class StateLogParser:
+    """Parser of the `state` stream lines.
+
+    Running the full `StateLogEntry` validation on every line dominates the statistics
+    computation for long-running apps, so only the first line is validated fully. The following
+    lines go through a fast path (a fast JSON decoder, table lookups instead of the enum and int
+    coercion, no pydantic validation), which falls back to the full validation on any line it can't
+    handle. Hence, the errors are reported the same way as with the validation of every line.
+    """
+
+    def __init__(self):
+        self._validated = False
+
+    def parse(self, raw_state: Union[str, bytes]) -> StateLogEntry:
+        """Parse a single line of the `state` stream.
+
+        Raises `pydantic.ValidationError` if the line is not a valid state log entry.
+        """
+
+        if self._validated:
+            try:
+                return self._parse_fast(raw_state)
+            except (ValueError, KeyError, TypeError, AttributeError, IndexError):
+                pass
+
+        state = StateLogEntry.parse_raw(raw_state)
+        self._validated = True
+        return state
+
+    @staticmethod
+    def parse_line_timestamp(raw_state: Union[str, bytes]) -> datetime:
+        """Return the timestamp of a single line of the `state` stream, without parsing the rest.
+
+        Raises `ValueError` if the line has no valid timestamp.
+        """
+
+        try:
+            return parse_timestamp(_json_loads(raw_state)["timestamp"])
+        except (KeyError, TypeError, AttributeError, IndexError) as e:
+            raise ValueError(f"Invalid state line timestamp: {e}")
+
+    @staticmethod
+    def _parse_fast(raw_state: Union[str, bytes]) -> StateLogEntry:
+        data = _json_loads(raw_state)
+        return StateLogEntry.construct(
+            nodes={
+                node: {
+                    _parse_node_index(node_idx): _NODE_STATES[state]
+                    for node_idx, state in node_states.items()
+                }
+                for node, node_states in data["nodes"].items()
+            },
+            timestamp=parse_timestamp(data["timestamp"]),
+            app=_NODE_STATES[data["app"]],
+            until=parse_timestamp(data["until"]) if "until" in data else None,
+        )
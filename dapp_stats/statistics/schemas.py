@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 
 from pydantic import BaseModel
 
@@ -10,3 +10,5 @@ class StateLogEntry(BaseModel):
     nodes: Dict[str, Dict[int, NodeState]]
     timestamp: datetime
     app: NodeState
+    # Timestamp of the last of the identical entries collapsed into a compacted record
+    until: Optional[datetime] = None
@@ -0,0 +1,112 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+
+from dapp_stats.statistics.enums import NodeState
+from dapp_stats.statistics.schemas import StateLogEntry
+
+
+@dataclass
+class NodeSummary:
+    """Mergeable summary of the consecutive states of a single node.
+
+    Unlike `NodeStatistics`, which can only be folded over the states in order, summaries of the
+    adjacent parts of the `state` stream can be computed independently and merged afterwards.
+
+    `changes` counts the state changes within the summarized part only and the transition
+    timestamps are the ones of the last transitions within it, matching the serial fold, where
+    each transition into `running` or `terminated` overwrites the previous one.
+    """
+
+    first_state: NodeState
+    first_timestamp: datetime
+    last_state: NodeState
+    last_timestamp: datetime
+    changes: int = 0
+    running_at: Optional[datetime] = None
+    terminated_at: Optional[datetime] = None
+
+    @classmethod
+    def start(cls, state: NodeState, timestamp: datetime) -> "NodeSummary":
+        return cls(
+            first_state=state, first_timestamp=timestamp, last_state=state, last_timestamp=timestamp
+        )
+
+    def add(self, state: NodeState, timestamp: datetime) -> None:
+        self.last_timestamp = timestamp
+        if state != self.last_state:
+            self._transition(state, timestamp)
+
+    def merge(self, other: "NodeSummary") -> "NodeSummary":
+        """Return the summary of this part of the stream directly followed by the `other` one."""
+
+        merged = NodeSummary(
+            first_state=self.first_state,
+            first_timestamp=self.first_timestamp,
+            last_state=self.last_state,
+            last_timestamp=self.last_timestamp,
+            changes=self.changes,
+            running_at=self.running_at,
+            terminated_at=self.terminated_at,
+        )
+        if other.first_state != merged.last_state:
+            merged._transition(other.first_state, other.first_timestamp)
+
+        merged.last_state = other.last_state
+        merged.last_timestamp = other.last_timestamp
+        merged.changes += other.changes
+        merged.running_at = other.running_at or merged.running_at
+        merged.terminated_at = other.terminated_at or merged.terminated_at
+        return merged
+
+    def _transition(self, state: NodeState, timestamp: datetime) -> None:
+        self.last_state = state
+        self.changes += 1
+        if state == NodeState.running:
+            self.running_at = timestamp
+        elif state == NodeState.terminated:
+            self.terminated_at = timestamp
+
+
+@dataclass
+class StatsSummary:
+    """Mergeable summaries of the app and its nodes over a part of the `state` stream."""
+
+    app: Optional[NodeSummary] = None
+    nodes: Dict[str, Dict[int, NodeSummary]] = field(default_factory=dict)
+
+    def add(self, app_state: StateLogEntry) -> None:
+        timestamp = app_state.timestamp
+        if self.app is not None:
+            self.app.add(app_state.app, timestamp)
+        else:
+            self.app = NodeSummary.start(app_state.app, timestamp)
+
+        for node, node_states in app_state.nodes.items():
+            node_summaries = self.nodes.setdefault(node, {})
+            for node_idx, state in node_states.items():
+                if node_idx in node_summaries:
+                    node_summaries[node_idx].add(state, timestamp)
+                else:
+                    node_summaries[node_idx] = NodeSummary.start(state, timestamp)
+
+    def merge(self, other: "StatsSummary") -> "StatsSummary":
+        """Return the summary of this part of the stream directly followed by the `other` one."""
+
+        merged = StatsSummary(app=_merge(self.app, other.app))
+        for node in {**self.nodes, **other.nodes}:
+            node_summaries = self.nodes.get(node, {})
+            other_summaries = other.nodes.get(node, {})
+            merged.nodes[node] = {
+                node_idx: _merge(node_summaries.get(node_idx), other_summaries.get(node_idx))
+                for node_idx in {**node_summaries, **other_summaries}
+            }
+        return merged
+
+
+def _merge(first: Optional[NodeSummary], second: Optional[NodeSummary]) -> NodeSummary:
+    if first is None:
+        return second  # type: ignore [return-value]
+    if second is None:
+        return first
+    return first.merge(second)
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+from typing import BinaryIO
+
+from dapp_stats.statistics.parser import StateLogParser
+
+# Below this size, the range is scanned line by line instead of bisected further
+WINDOW_SCAN_SIZE = 64 * 1024
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    """Return the timestamp as an aware datetime, assuming UTC for naive ones like the runner."""
+
+    return timestamp if timestamp.tzinfo is not None else timestamp.replace(tzinfo=timezone.utc)
+
+
+def seek_timestamp(f: BinaryIO, timestamp: datetime, start: int, end: int) -> int:
+    """Return the offset of the first line of the `state` stream not older than `timestamp`.
+
+    The timestamps of the stream are in order, so the offset is bisected between the `start`
+    (which must be the start of a line) and `end` offsets, reading only a few lines of the file.
+    Returns `end` if all the lines of the range are older.
+
+    Raises `ValueError` if a line with an invalid timestamp is encountered.
+    """
+
+    timestamp = as_utc(timestamp)
+    # Invariant: all the lines starting before `lo` are older than `timestamp`
+    lo, hi = start, end
+    while hi - lo > WINDOW_SCAN_SIZE:
+        mid = (lo + hi) // 2
+        # Move to the start of the first line at or after `mid`
+        if mid > 0:
+            f.seek(mid - 1)
+            f.readline()
+        else:
+            f.seek(0)
+        line_start = f.tell()
+        line = f.readline()
+        if line_start >= hi or not line.endswith(b"\n"):
+            hi = mid
+        elif as_utc(StateLogParser.parse_line_timestamp(line)) < timestamp:
+            lo = line_start + len(line)
+        else:
+            hi = mid
+
+    f.seek(lo)
+    pos = lo
+    for line in f:
+        if pos >= end or not line.endswith(b"\n"):
+            break
+        if as_utc(StateLogParser.parse_line_timestamp(line)) >= timestamp:
+            return pos
+        pos += len(line)
+    return min(pos, end)
@@ -0,0 +1,328 @@
+import os
+import struct
+import tempfile
+import zipfile
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import pydantic
+
+from .exceptions import DappStatsException
+from .statistics.enums import NodeState
+from .statistics.parser import StateLogParser
+
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
+
+# Codes of the `state` column are the positions of the states in this tuple
+TIMELINE_STATES: Tuple[NodeState, ...] = tuple(NodeState)
+# The app itself is the node 0 of the timeline, with the name and index below
+TIMELINE_APP_NODE = ("", -1)
+TIMELINE_PERCENTILES = (50, 90, 99)
+# Number of rows buffered in memory for each of the columns, before they're flushed to disk
+TIMELINE_BUFFER_ROWS = 64 * 1024
+
+# Columns with a row for each state change, as (array typecode, numpy dtype)
+_COLUMNS: Dict[str, Tuple[str, str]] = {
+    "timestamp": ("q", "int64"),
+    "node": ("i", "int32"),
+    "state": ("b", "int8"),
+}
+_STATE_CODES = {state: code for code, state in enumerate(TIMELINE_STATES)}
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_COPY_CHUNK_SIZE = 2**20
+_HOUR = timedelta(hours=1) // _MICROSECOND
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise DappStatsException(
+            "State timeline requires numpy, install dapp-manager with the `analytics` extra."
+        )
+    return numpy
+
+
+@dataclass
+class StateTimeline:
+    """Columnar representation of the `state` stream, for vectorized analysis.
+
+    A row of the `timestamp` (microseconds since the epoch), `node` and `state` columns is
+    recorded each time a node (or the app itself, which is the node 0) enters a new state.
+    Nodes are identified by their positions in the `node_names` and `node_indexes` columns,
+    states by their positions in `TIMELINE_STATES`. `end_timestamp` is the one of the last line
+    of the stream, i.e. the end of the last recorded states.
+    """
+
+    timestamp: "np.ndarray"
+    node: "np.ndarray"
+    state: "np.ndarray"
+    node_names: "np.ndarray"
+    node_indexes: "np.ndarray"
+    end_timestamp: int
+
+    @property
+    def node_labels(self) -> List[str]:
+        return [
+            "app" if idx == TIMELINE_APP_NODE[1] else f"{name}[{idx}]"
+            for name, idx in zip(self.node_names.tolist(), self.node_indexes.tolist())
+        ]
+
+    def metrics(self) -> Dict:
+        """Return the detailed statistics of the nodes, computed with vectorized operations.
+
+        For each node: the total time spent in each of the states, the number of unresponsive
+        episodes, the flapping rate (unresponsive episodes per hour of the node's lifetime) and the
+        time from its first state to its first `running` state. For each service: the totals over
+        its replicas and the percentiles of their times to launch.
+        """
+
+        np = _import_numpy()
+        if not len(self.timestamp):
+            return {"app": {}, "nodes": {}, "services": {}}
+
+        nodes_count, states_count = len(self.node_names), len(TIMELINE_STATES)
+        # Rows grouped by node, in the order of time within each group
+        order = np.argsort(self.node, kind="stable")
+        node = np.asarray(self.node[order], dtype=np.int64)
+        state = np.asarray(self.state[order], dtype=np.int64)
+        timestamp = np.asarray(self.timestamp[order], dtype=np.int64)
+
+        is_last = np.ones(len(node), dtype=bool)
+        is_last[:-1] = node[1:] != node[:-1]
+        is_first = np.roll(is_last, 1)
+        end = np.where(is_last, self.end_timestamp, np.roll(timestamp, -1))
+        time_in_state = np.bincount(
+            node * states_count + state,
+            weights=end - timestamp,
+            minlength=nodes_count * states_count,
+        ).reshape(nodes_count, states_count)
+
+        first_timestamp = np.zeros(nodes_count, dtype=np.int64)
+        first_timestamp[node[is_first]] = timestamp[is_first]
+        lifetime = self.end_timestamp - first_timestamp
+
+        unresponsive = state == _STATE_CODES[NodeState.unresponsive]
+        episodes = np.bincount(node[unresponsive], minlength=nodes_count)
+
+        running = np.flatnonzero(state == _STATE_CODES[NodeState.running])
+        launched_nodes, first_running = np.unique(node[running], return_index=True)
+        time_to_launch = np.full(nodes_count, -1, dtype=np.int64)
+        time_to_launch[launched_nodes] = (
+            timestamp[running[first_running]] - first_timestamp[launched_nodes]
+        )
+
+        def node_metrics(node_id: int) -> Dict:
+            return {
+                "time_in_state": _state_durations(time_in_state[node_id]),
+                "unresponsive_episodes": int(episodes[node_id]),
+                "flapping_rate": (
+                    float(episodes[node_id] / lifetime[node_id] * _HOUR)
+                    if lifetime[node_id]
+                    else None
+                ),
+                "time_to_launch": (
+                    timedelta(microseconds=int(time_to_launch[node_id]))
+                    if time_to_launch[node_id] >= 0
+                    else None
+                ),
+            }
+
+        services: Dict[str, List[int]] = {}
+        metrics: Dict[str, Any] = {"app": node_metrics(0), "nodes": {}, "services": {}}
+        for node_id, (name, idx) in enumerate(zip(self.node_names.tolist(), self.node_indexes)):
+            if node_id != 0:
+                metrics["nodes"].setdefault(name, {})[int(idx)] = node_metrics(node_id)
+                services.setdefault(name, []).append(node_id)
+
+        for name, node_ids in services.items():
+            launch_times = time_to_launch[node_ids]
+            launch_times = launch_times[launch_times >= 0]
+            metrics["services"][name] = {
+                "replicas": len(node_ids),
+                "time_in_state": _state_durations(time_in_state[node_ids].sum(axis=0)),
+                "unresponsive_episodes": int(episodes[node_ids].sum()),
+                "time_to_launch": (
+                    {
+                        f"p{q}": timedelta(microseconds=int(value))
+                        for q, value in zip(
+                            TIMELINE_PERCENTILES, np.percentile(launch_times, TIMELINE_PERCENTILES)
+                        )
+                    }
+                    if len(launch_times)
+                    else None
+                ),
+            }
+
+        return metrics
+
+    @classmethod
+    def export(cls, raw_states: Iterable[Union[str, bytes]], path: Union[str, Path]) -> int:
+        """Write the timeline of the given `state` lines to an `.npz` file, return its row count.
+
+        The lines are processed in a single pass, buffering a bounded number of rows. The members
+        of the file are stored uncompressed, so that they can be memory-mapped by `load`.
+        """
+
+        np = _import_numpy()
+        parser = StateLogParser()
+        node_ids: Dict[Tuple[str, int], int] = {TIMELINE_APP_NODE: 0}
+        last_states: List[Optional[int]] = [None]
+        end_timestamp = 0
+        rows = 0
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            column_files = {name: open(Path(tmp_dir) / name, "wb") for name in _COLUMNS}
+            buffers = {name: array(typecode) for name, (typecode, _) in _COLUMNS.items()}
+            timestamps, nodes, states = buffers["timestamp"], buffers["node"], buffers["state"]
+
+            try:
+                for raw_state in raw_states:
+                    try:
+                        app_state = parser.parse(raw_state)
+                    except pydantic.ValidationError:
+                        raise DappStatsException(
+                            "State log is corrupted. Unable to export the timeline."
+                        )
+
+                    timestamp = _to_epoch_microseconds(app_state.timestamp)
+                    end_timestamp = (
+                        _to_epoch_microseconds(app_state.until) if app_state.until else timestamp
+                    )
+                    changes = [(0, app_state.app)]
+                    for node, node_states in app_state.nodes.items():
+                        for node_idx, state in node_states.items():
+                            node_id = node_ids.get((node, node_idx))
+                            if node_id is None:
+                                node_id = node_ids[(node, node_idx)] = len(node_ids)
+                                last_states.append(None)
+                            changes.append((node_id, state))
+
+                    for node_id, state in changes:
+                        state_code = _STATE_CODES[state]
+                        if last_states[node_id] != state_code:
+                            last_states[node_id] = state_code
+                            timestamps.append(timestamp)
+                            nodes.append(node_id)
+                            states.append(state_code)
+
+                    if len(timestamps) >= TIMELINE_BUFFER_ROWS:
+                        rows += len(timestamps)
+                        _flush(buffers, column_files)
+
+                rows += len(timestamps)
+                _flush(buffers, column_files)
+            finally:
+                for f in column_files.values():
+                    f.close()
+
+            node_names, node_indexes = zip(*node_ids)
+            with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as zf:
+                for name, (_, dtype) in _COLUMNS.items():
+                    _write_member(np, zf, name, np.dtype(dtype), rows, Path(tmp_dir) / name)
+                for name, value in (
+                    ("node_names", np.array(node_names, dtype=str)),
+                    ("node_indexes", np.array(node_indexes, dtype="int32")),
+                    ("end_timestamp", np.array(end_timestamp, dtype="int64")),
+                ):
+                    with zf.open(f"{name}.npy", "w") as member:
+                        np.lib.format.write_array(member, value)
+
+        return rows
+
+    @classmethod
+    def load(cls, path: Union[str, Path], *, mmap: bool = True) -> "StateTimeline":
+        """Load the timeline written by `export`, memory-mapping its columns if requested."""
+
+        np = _import_numpy()
+        members: Dict[str, Any] = {}
+        try:
+            with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+                for info in zf.infolist():
+                    name = info.filename[: -len(".npy")]
+                    if mmap and info.compress_type == zipfile.ZIP_STORED:
+                        members[name] = _memmap_member(np, f, path, info)
+                    else:
+                        with zf.open(info) as member:
+                            members[name] = np.lib.format.read_array(member)
+        except (zipfile.BadZipFile, ValueError) as e:
+            raise DappStatsException(f"{path} is not a state timeline: {e}")
+
+        try:
+            return cls(
+                timestamp=members["timestamp"],
+                node=members["node"],
+                state=members["state"],
+                node_names=members["node_names"],
+                node_indexes=members["node_indexes"],
+                end_timestamp=int(members["end_timestamp"]),
+            )
+        except KeyError as e:
+            raise DappStatsException(f"{path} is not a state timeline, missing column: {e}.")
+
+
+def _to_epoch_microseconds(timestamp: datetime) -> int:
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    # Integer arithmetic, so that the microsecond precision isn't lost on a float conversion
+    return (timestamp - _EPOCH) // _MICROSECOND
+
+
+def _state_durations(durations) -> Dict[str, timedelta]:
+    return {
+        state.value: timedelta(microseconds=round(duration))
+        for state, duration in zip(TIMELINE_STATES, durations.tolist())
+        if duration
+    }
+
+
+def _flush(buffers: Dict[str, array], column_files: Dict[str, Any]) -> None:
+    for name, buffer in buffers.items():
+        buffer.tofile(column_files[name])
+        del buffer[:]
+
+
+def _write_member(np, zf: zipfile.ZipFile, name: str, dtype, rows: int, data_file: Path) -> None:
+    size = os.path.getsize(data_file)
+    with zf.open(f"{name}.npy", "w", force_zip64=size > 2**30) as member:
+        np.lib.format.write_array_header_1_0(
+            member,
+            {
+                "descr": np.lib.format.dtype_to_descr(dtype),
+                "fortran_order": False,
+                "shape": (rows,),
+            },
+        )
+        with open(data_file, "rb") as data:
+            for chunk in iter(lambda: data.read(_COPY_CHUNK_SIZE), b""):
+                member.write(chunk)
+
+
+def _memmap_member(np, f, path: Union[str, Path], info: zipfile.ZipInfo):
+    # Data of a stored member follows its local file header, whose size is variable
+    f.seek(info.header_offset + 26)
+    name_length, extra_length = struct.unpack("<HH", f.read(4))
+    f.seek(info.header_offset + 30 + name_length + extra_length)
+
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+    if dtype.hasobject or not shape or 0 in shape:
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        return np.lib.format.read_array(f)
+    return np.memmap(
+        path,
+        dtype=dtype,
+        mode="r",
+        offset=f.tell(),
+        shape=shape,
+        order="F" if fortran_order else "C",
+    )
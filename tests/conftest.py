@@ -12,3 +12,12 @@ def simple_storage_test_dir(monkeypatch):
     with tempfile.TemporaryDirectory(prefix="dapp-manager-tests-") as test_dir_name:
         monkeypatch.setattr(DappManager, "_get_data_dir", lambda: test_dir_name)
         yield
+
+
+@pytest.fixture(autouse=True)
+def cache_test_dir(monkeypatch):
+    """Replace the default cache directory with a temporary directory."""
+
+    with tempfile.TemporaryDirectory(prefix="dapp-manager-tests-cache-") as test_dir_name:
+        monkeypatch.setattr(DappManager, "_get_cache_dir", lambda: test_dir_name)
+        yield test_dir_name
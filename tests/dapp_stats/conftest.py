@@ -0,0 +1,10 @@
+import pytest
+
+from dapp_manager import DappManager
+
+
+@pytest.fixture
+def app_storage():
+    storage = DappManager._create_storage("app_id")
+    storage.init()
+    return storage
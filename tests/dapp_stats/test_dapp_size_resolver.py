@@ -1,17 +1,58 @@
+import http.client
+import threading
+from datetime import timedelta
 from pathlib import Path
-from typing import List
-from urllib.error import HTTPError
+from typing import Dict, List, Mapping, Union
 
 import pytest
 
 from dapp_stats.dapp_size_resolver import DappSizeResolver, DappSizeResolverError
+from dapp_stats.http_pool import HttpResponse
+
+REPO_URL = "http://repo"
+IMAGE_URL = "http://repo/image.gvmi"
+
+
+@pytest.fixture
+def resolve_repo_srv(mocker):
+    return mocker.patch("dapp_stats.dapp_size_resolver.resolve_repo_srv", return_value=REPO_URL)
 
 
 @pytest.fixture
-def dapp_size_resolver():
+def dapp_size_resolver(resolve_repo_srv):
     return DappSizeResolver
 
 
+def _link_url(image_hash: str) -> str:
+    return f"{REPO_URL}/image.{image_hash}.link"
+
+
+def _mock_http(mocker, responses: Mapping[str, Union[bytes, Mapping[str, str], int, Exception]]):
+    """Mock the HTTP requests with the given responses (or errors) to the requested URLs.
+
+    A response is given as its body, its headers or its (error) status.
+    """
+
+    def request(method, url, headers=None):
+        response = responses[url]
+        if isinstance(response, Exception):
+            raise response
+
+        status, message, body = 200, http.client.HTTPMessage(), b""
+        if isinstance(response, bytes):
+            body = response
+        elif isinstance(response, int):
+            status = response
+        else:
+            for name, value in response.items():
+                message[name] = value
+        return HttpResponse(status, http.client.responses[status], message, body)
+
+    return mocker.patch(
+        "dapp_stats.dapp_size_resolver.HttpConnectionPool.request", side_effect=request
+    )
+
+
 @pytest.mark.parametrize(
     "descriptor_paths, mocked_sizes, expected_sizes, expected_errors",
     (
@@ -46,21 +87,12 @@ def test_resolve_vm_runtime_payload_size(
     expected_errors,
     mocker,
 ):
-    mocked_image_url_from_repo_package_url = mocker.Mock(**{"read.return_value": b"some_gvmi_link"})
-
-    mocked_urlopen = mocker.patch("dapp_stats.dapp_size_resolver.request.urlopen")
-    urlopen_mocks = []
-    for mocked_size in mocked_sizes:
-        mocked_payload_size_from_image_url = mocker.Mock(headers={"Content-Length": mocked_size})
-
-        urlopen_mocks.extend(
-            [
-                mocked_image_url_from_repo_package_url,
-                mocked_payload_size_from_image_url,
-            ]
-        )
-
-    mocked_urlopen.return_value.__enter__.side_effect = urlopen_mocks
+    responses: Dict[str, Union[bytes, Dict]] = {}
+    for payload_name, mocked_size in zip("ab", mocked_sizes):
+        image_url = f"some_gvmi_link_{payload_name}"
+        responses[_link_url(f"{payload_name}_image_hash")] = image_url.encode()
+        responses[image_url] = {"Content-Length": mocked_size}
+    _mock_http(mocker, responses)
 
     sizes, errors = dapp_size_resolver.resolve_defined_payload_sizes(descriptor_paths)
 
@@ -81,8 +113,7 @@ def test_resolve_vm_runtime_payload_size_missing_image_hash(dapp_size_resolver):
 
 
 def test_resolve_vm_runtime_payload_size_image_hash_not_found_in_repo(dapp_size_resolver, mocker):
-    mocked_urlopen = mocker.patch("dapp_stats.dapp_size_resolver.request.urlopen")
-    mocked_urlopen.side_effect = HTTPError("some_url", 404, "not found?!", mocker.Mock(), None)
+    _mock_http(mocker, {_link_url("not_existing"): 404})
 
     sizes, errors = dapp_size_resolver.resolve_defined_payload_sizes(
         [Path("tests/assets/descriptors/bad_vm_runtime_not_existing_image_hash.yaml")]
@@ -94,11 +125,13 @@ def test_resolve_vm_runtime_payload_size_image_hash_not_found_in_repo(dapp_size_
 
 
 def test_resolve_vm_runtime_payload_size_image_url_not_found(dapp_size_resolver, mocker):
-    mocked_urlopen = mocker.patch("dapp_stats.dapp_size_resolver.request.urlopen")
-    mocked_urlopen.return_value.__enter__.side_effect = [
-        mocker.Mock(**{"read.return_value": b"some_gvmi_link"}),
-        HTTPError("some_url", 404, "not found?!", mocker.Mock(), None),
-    ]
+    _mock_http(
+        mocker,
+        {
+            _link_url("not_existing"): b"some_gvmi_link",
+            "some_gvmi_link": 404,
+        },
+    )
 
     sizes, errors = dapp_size_resolver.resolve_defined_payload_sizes(
         [Path("tests/assets/descriptors/bad_vm_runtime_not_existing_image_hash.yaml")]
@@ -143,10 +176,13 @@ def test_resolve_vm_manifest_runtime_payload_size(
     expected_errors,
     mocker,
 ):
-    mocked_urlopen = mocker.patch("dapp_stats.dapp_size_resolver.request.urlopen")
-    mocked_urlopen.return_value.__enter__.side_effect = [
-        mocker.Mock(headers={"Content-Length": mocked_size}) for mocked_size in mocked_sizes
-    ]
+    _mock_http(
+        mocker,
+        {
+            url: {"Content-Length": mocked_size}
+            for url, mocked_size in zip(("some_url", "some_other_url"), mocked_sizes)
+        },
+    )
 
     sizes, errors = dapp_size_resolver.resolve_defined_payload_sizes(descriptor_paths)
 
@@ -202,18 +238,14 @@ def test_resolve_combined_runtime_payload_size(dapp_size_resolver, mocker):
     expected_sizes = {"total_size": 444, "payloads": {"a": 123, "b": 321}}
     expected_errors: List[str] = []
 
-    mocked_image_url_from_repo_package_url = mocker.Mock(**{"read.return_value": b"some_gvmi_link"})
-    mocked_payload_size_from_image_urls = [
-        mocker.Mock(headers={"Content-Length": "123"}),
-        mocker.Mock(headers={"Content-Length": "321"}),
-    ]
-
-    mocked_urlopen = mocker.patch("dapp_stats.dapp_size_resolver.request.urlopen")
-
-    mocked_urlopen.return_value.__enter__.side_effect = [
-        mocked_image_url_from_repo_package_url,
-        *mocked_payload_size_from_image_urls,
-    ]
+    _mock_http(
+        mocker,
+        {
+            _link_url("a_image_hash"): b"some_gvmi_link",
+            "some_gvmi_link": {"Content-Length": "123"},
+            "some_other_url": {"Content-Length": "321"},
+        },
+    )
 
     sizes, errors = dapp_size_resolver.resolve_defined_payload_sizes(descriptor_paths)
 
@@ -243,3 +275,113 @@ def test_resolve_payload_size_unknown_payload_runtime(dapp_size_resolver):
         ' "unsupported or something..." is not supported!'
     ]
     assert sizes == {"total_size": 0, "payloads": {}}
+
+
+def test_resolve_payload_sizes_concurrently(dapp_size_resolver, mocker):
+    # both size requests must be in flight at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    mocked_request = _mock_http(
+        mocker,
+        {
+            "some_url": {"Content-Length": "123"},
+            "some_other_url": {"Content-Length": "321"},
+        },
+    )
+    request = mocked_request.side_effect
+
+    def request_concurrently(*args, **kwargs):
+        barrier.wait()
+        return request(*args, **kwargs)
+
+    mocked_request.side_effect = request_concurrently
+
+    sizes, errors = dapp_size_resolver.resolve_defined_payload_sizes(
+        [Path("tests/assets/descriptors/correct_vm_manifest_runtime_ab.yaml")]
+    )
+
+    assert errors == []
+    assert sizes == {"total_size": 444, "payloads": {"a": 123, "b": 321}}
+
+
+def test_resolve_payload_size_timeout(dapp_size_resolver, mocker):
+    _mock_http(
+        mocker,
+        {
+            "some_url": {"Content-Length": "123"},
+            "some_other_url": TimeoutError("timed out"),
+        },
+    )
+
+    sizes, errors = dapp_size_resolver.resolve_defined_payload_sizes(
+        [Path("tests/assets/descriptors/correct_vm_manifest_runtime_ab.yaml")]
+    )
+
+    assert errors == [
+        'Ignoring payload "b" as following error occurred: Can\'t fetch payload size from image'
+        ' url "some_other_url": timed out'
+    ]
+    assert sizes == {"total_size": 123, "payloads": {"a": 123}}
+
+
+def test_resolve_payload_size_cached(dapp_size_resolver, resolve_repo_srv, mocker):
+    descriptor_paths = [Path("tests/assets/descriptors/correct_vm_runtime_a.yaml")]
+    mocked_request = _mock_http(
+        mocker,
+        {
+            _link_url("a_image_hash"): IMAGE_URL.encode(),
+            IMAGE_URL: {"Content-Length": "123", "ETag": '"v1"'},
+        },
+    )
+    expected_sizes = {"total_size": 123, "payloads": {"a": 123}}
+    assert dapp_size_resolver.resolve_defined_payload_sizes(descriptor_paths) == (
+        expected_sizes,
+        [],
+    )
+    assert mocked_request.call_count == 2
+
+    # repeated sizing doesn't touch the network
+    resolve_repo_srv.reset_mock()
+    assert dapp_size_resolver.resolve_defined_payload_sizes(descriptor_paths) == (
+        expected_sizes,
+        [],
+    )
+    assert mocked_request.call_count == 2
+    resolve_repo_srv.assert_not_called()
+
+    # an expired size is revalidated with its ETag, the image url is still cached
+    mocker.patch("dapp_stats.payload_cache.PAYLOAD_SIZE_TTL", timedelta(0))
+    _mock_http(mocker, {IMAGE_URL: 304})
+    assert dapp_size_resolver.resolve_defined_payload_sizes(descriptor_paths) == (
+        expected_sizes,
+        [],
+    )
+
+
+def test_resolve_payload_size_refresh(dapp_size_resolver, mocker):
+    descriptor_paths = [Path("tests/assets/descriptors/correct_vm_runtime_a.yaml")]
+    link = IMAGE_URL.encode()
+    _mock_http(
+        mocker,
+        {
+            _link_url("a_image_hash"): link,
+            IMAGE_URL: {"Content-Length": "123", "ETag": '"v1"'},
+        },
+    )
+    dapp_size_resolver.resolve_defined_payload_sizes(descriptor_paths)
+
+    mocked_request = _mock_http(
+        mocker,
+        {
+            _link_url("a_image_hash"): link,
+            IMAGE_URL: {"Content-Length": "321", "ETag": '"v2"'},
+        },
+    )
+    sizes, _ = dapp_size_resolver.resolve_defined_payload_sizes(descriptor_paths)
+    assert sizes["total_size"] == 123
+    mocked_request.assert_not_called()
+
+    sizes, _ = dapp_size_resolver.resolve_defined_payload_sizes(descriptor_paths, refresh=True)
+    assert sizes["total_size"] == 321
+    assert mocked_request.call_args.args == ("HEAD", IMAGE_URL, {"If-None-Match": '"v1"'})
+    sizes, _ = dapp_size_resolver.resolve_defined_payload_sizes(descriptor_paths)
+    assert sizes["total_size"] == 321
@@ -1,10 +1,27 @@
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List
 
+import pytest
+
+from dapp_manager import DappManager
 from dapp_stats import DappStats
+from dapp_stats.exceptions import DappStatsException
+from dapp_stats.statistics import parallel
+from dapp_stats.statistics.schemas import StateLogEntry
+from dapp_stats.statistics.window import seek_timestamp
+
+STATE_LINES: List[str] = [
+    '{"nodes": {"db": {"0": "pending"}}, "timestamp": "2022-12-19T10:22:53Z", "app": "pending"}\n',  # noqa
+    '{"nodes": {"db": {"0": "starting"}}, "timestamp": "2022-12-19T10:23:53Z", "app": "starting"}\n',  # noqa
+    '{"nodes": {"db": {"0": "running"}, "http": {"0": "pending"}}, "timestamp": "2022-12-19T10:24:53Z", "app": "starting"}\n',  # noqa
+    '{"nodes": {"db": {"0": "running"}, "http": {"0": "starting"}}, "timestamp": "2022-12-19T10:25:53Z", "app": "starting"}\n',  # noqa
+    '{"nodes": {"db": {"0": "running"}, "http": {"0": "running"}}, "timestamp": "2022-12-19T10:26:53Z", "app": "running"}\n',  # noqa
+    '{"nodes": {"db": {"0": "terminated"}, "http": {"0": "running"}}, "timestamp": "2022-12-19T10:27:53Z", "app": "stopping"}\n',  # noqa
+    '{"nodes": {"db": {"0": "terminated"}, "http": {"0": "terminated"}}, "timestamp": "2022-12-19T10:28:53Z", "app": "terminated"}\n',  # noqa
+]
 
 
-def test_get_stats_ok(mocker):
+def test_get_stats_ok(mocker, app_storage):
     states_payload: List[str] = [
         '{"nodes": {"db": {"0": "pending"}}, "timestamp": "2022-12-19T10:22:53Z", "app": "pending"}',  # noqa
         '{"nodes": {"db": {"0": "starting"}}, "timestamp": "2022-12-19T10:23:53Z", "app": "starting"}',  # noqa
@@ -24,10 +41,248 @@ def test_get_stats_ok(mocker):
     assert stats["app"]["terminated"] is False
 
 
-def test_get_stats_no_states(mocker):
+def test_get_stats_no_states(mocker, app_storage):
     states_payload: List[str] = []
     dapp_stats = DappStats("app_id")
     mocker.patch.object(DappStats, DappStats._iter_app_states.__name__, return_value=states_payload)
     stats = dapp_stats.get_stats()
     assert stats["nodes"] == {}
     assert stats["app"] == {}
+
+
+def test_get_stats_incremental(mocker, app_storage):
+    dapp_stats = DappStats("app_id")
+    parse_raw = mocker.spy(StateLogEntry, "parse_raw")
+    construct = mocker.spy(StateLogEntry, "construct")
+
+    for line in STATE_LINES[:3]:
+        app_storage.write_file("state", line)
+    dapp_stats.get_stats()
+    assert parse_raw.call_count + construct.call_count == 3
+
+    for line in STATE_LINES[3:]:
+        app_storage.write_file("state", line)
+    # an incomplete line is left for the next call
+    app_storage.write_file("state", STATE_LINES[0][:20])
+    stats = dapp_stats.get_stats()
+    assert parse_raw.call_count + construct.call_count == len(STATE_LINES)
+
+    assert stats == DappStats("app_id").get_stats(checkpoint=False)
+    assert stats["app"]["terminated"] is True
+    assert stats["app"]["working_time"] == timedelta(minutes=6)
+    assert stats["nodes"]["db"][0]["working_time"] == timedelta(minutes=5)
+    assert stats["nodes"]["http"][0]["time_to_launch"] == timedelta(minutes=2)
+
+
+def test_get_stats_checkpoint_invalidated(app_storage):
+    dapp_stats = DappStats("app_id")
+    for line in STATE_LINES:
+        app_storage.write_file("state", line)
+    assert dapp_stats.get_stats()["app"]["terminated"] is True
+
+    # the state stream is rewritten, e.g. after the app is resumed
+    app_storage.file_name("state").unlink()
+    for line in STATE_LINES[1:3]:
+        app_storage.write_file("state", line)
+
+    stats = dapp_stats.get_stats()
+    assert stats["app"]["terminated"] is False
+    assert stats["app"]["state_changes"] == 1
+    assert stats == DappStats("app_id").get_stats(checkpoint=False)
+
+
+def test_follow_stats(mocker, app_storage):
+    mocker.patch("dapp_stats.dapp_stats.STATS_FOLLOW_INTERVAL", timedelta())
+    mocker.patch.object(
+        DappManager, "alive", new_callable=mocker.PropertyMock, side_effect=[True, False]
+    )
+    dapp_stats = DappStats("app_id")
+    for line in STATE_LINES[:3]:
+        app_storage.write_file("state", line)
+
+    updates = dapp_stats.follow_stats()
+    initial = [next(updates) for _ in range(3)]
+    assert [(u["node"], u["index"], u["state"]) for u in initial] == [
+        (None, None, "starting"),
+        ("db", 0, "running"),
+        ("http", 0, "pending"),
+    ]
+    assert all(u["timestamp"] is None for u in initial)
+
+    for line in STATE_LINES[3:]:
+        app_storage.write_file("state", line)
+
+    changes = list(updates)
+    assert [(u["node"], u["state"]) for u in changes] == [
+        ("http", "starting"),
+        (None, "running"),
+        ("http", "running"),
+        (None, "stopping"),
+        ("db", "terminated"),
+        (None, "terminated"),
+        ("http", "terminated"),
+    ]
+    assert changes[-1]["statistics"]["working_time"] == timedelta(minutes=4)
+    assert changes[-2]["statistics"]["terminated"] is True
+
+    # the followed statistics are checkpointed
+    assert dapp_stats.get_stats() == DappStats("app_id").get_stats(checkpoint=False)
+
+
+def test_get_stats_parallel(mocker, app_storage):
+    mocker.patch("dapp_stats.statistics.parallel.PARALLEL_MIN_RANGE_SIZE", 1)
+    split_state_file = mocker.spy(parallel, "split_state_file")
+    dapp_stats = DappStats("app_id")
+    for line in STATE_LINES[:2]:
+        app_storage.write_file("state", line)
+    dapp_stats.get_stats(processes=3)
+
+    for line in STATE_LINES[2:]:
+        app_storage.write_file("state", line)
+    stats = dapp_stats.get_stats(processes=3)
+
+    assert stats == DappStats("app_id").get_stats(checkpoint=False)
+    # the checkpoint of the parallel run is valid for the following serial runs
+    assert stats == DappStats("app_id").get_stats()
+    # the lines appended since the first call are split between the processes
+    assert len(split_state_file.spy_return) == 3
+
+
+def test_split_state_file(tmp_path, mocker):
+    mocker.patch("dapp_stats.statistics.parallel.PARALLEL_MIN_RANGE_SIZE", 1)
+    state_file = tmp_path / "state"
+    state_file.write_text("".join(STATE_LINES))
+    size = state_file.stat().st_size
+
+    ranges = parallel.split_state_file(state_file, 0, size, 4)
+    assert len(ranges) == 4
+    assert ranges[0][0] == 0 and ranges[-1][1] == size
+    lines = []
+    for start, end in ranges:
+        summary, pos = parallel.summarize_state_range(state_file, start, end)
+        assert pos == end
+        lines.append(state_file.read_bytes()[start:end].decode())
+    assert "".join(lines) == "".join(STATE_LINES)
+
+
+@pytest.mark.parametrize("processes", (1, 2))
+def test_fleet(app_storage, processes):
+    for line in STATE_LINES:
+        app_storage.write_file("state", line)
+    running_storage = DappManager._create_storage("running_app_id")
+    running_storage.init()
+    for line in STATE_LINES[:5]:
+        running_storage.write_file("state", line)
+    corrupted_storage = DappManager._create_storage("corrupted_app_id")
+    corrupted_storage.init()
+    corrupted_storage.write_file("state", "{}\n")
+
+    fleet_stats = DappStats.fleet(processes=processes)
+
+    assert fleet_stats["apps"]["count"] == 2
+    assert fleet_stats["apps"]["launch_success_rate"] == 1
+    assert fleet_stats["apps"]["time_to_launch"]["p50"] == timedelta(minutes=4)
+    assert fleet_stats["apps"]["working_time"]["count"] == 1
+    assert fleet_stats["apps"]["states"] == {"terminated": 1, "running": 1}
+    assert fleet_stats["nodes"]["count"] == 4
+    assert fleet_stats["nodes"]["time_to_launch"]["max"] == timedelta(minutes=2)
+    assert fleet_stats["nodes"]["states"] == {"terminated": 2, "running": 2}
+    assert list(fleet_stats["errors"]) == ["corrupted_app_id"]
+
+    # statistics of the apps are checkpointed
+    assert DappStats("running_app_id").get_stats() == DappStats("running_app_id").get_stats(
+        checkpoint=False
+    )
+    assert list(DappStats.fleet(["app_id", "no_such_app"])["errors"]) == ["no_such_app"]
+
+
+@pytest.mark.parametrize(
+    "since, until, expected_states",
+    (
+        ("2022-12-19T10:24:53+00:00", None, ["starting", "running", "stopping", "terminated"]),
+        (None, "2022-12-19T10:24:53+00:00", ["pending", "starting"]),
+        ("2022-12-19T10:24:00", "2022-12-19T10:27:00", ["starting", "running"]),
+        ("2022-12-19T10:30:00+00:00", None, []),
+    ),
+)
+def test_get_stats_window(mocker, app_storage, since, until, expected_states):
+    mocker.patch("dapp_stats.statistics.window.WINDOW_SCAN_SIZE", 0)
+    for line in STATE_LINES:
+        app_storage.write_file("state", line)
+    since = datetime.fromisoformat(since) if since else None
+    until = datetime.fromisoformat(until) if until else None
+
+    stats = DappStats("app_id").get_stats(since=since, until=until)
+
+    if expected_states:
+        assert stats["app"]["state_changes"] == len(expected_states)
+        assert stats["app"]["launched_successfully"] is ("running" in expected_states[1:])
+    else:
+        assert stats == {"app": {}, "nodes": {}}
+    # windows are not checkpointed
+    assert not app_storage.file_name("stats_checkpoint").exists()
+
+
+def test_seek_timestamp(tmp_path, mocker):
+    mocker.patch("dapp_stats.statistics.window.WINDOW_SCAN_SIZE", 0)
+    state_file = tmp_path / "state"
+    state_file.write_text("".join(STATE_LINES))
+    offsets = [0]
+    for line in STATE_LINES:
+        offsets.append(offsets[-1] + len(line))
+
+    with state_file.open("rb") as f:
+        for minute, expected_line in ((0, 0), (23, 1), (25, 3), (25.5, 4), (28, 6), (29, 7)):
+            timestamp = datetime(2022, 12, 19, 10, 22, 53, tzinfo=timezone.utc) + timedelta(
+                minutes=minute - 22
+            )
+            assert seek_timestamp(f, timestamp, 0, offsets[-1]) == offsets[expected_line]
+        # the search is limited to the given range
+        timestamp = datetime(2022, 12, 19, 10, 29, tzinfo=timezone.utc)
+        assert seek_timestamp(f, timestamp, offsets[1], offsets[3]) == offsets[3]
+
+
+def test_compact_state(mocker, app_storage):
+    mocker.patch("dapp_stats.statistics.parallel.PARALLEL_MIN_RANGE_SIZE", 1)
+    dapp = DappManager("app_id")
+    dapp_stats = DappStats("app_id")
+    # each state is repeated for 3 seconds
+    lines = [line.replace(":53Z", f":5{second}Z") for line in STATE_LINES for second in (3, 4, 5)]
+    for line in lines[:10]:
+        app_storage.write_file("state", line)
+    stats = dapp_stats.get_stats()
+
+    assert dapp.compact_state()["records"] == 4
+    assert dapp_stats.get_stats(checkpoint=False) == stats
+    # the checkpoint from before the compaction remains valid
+    assert dapp_stats.get_stats() == stats
+
+    for line in lines[10:]:
+        app_storage.write_file("state", line)
+    stats = dapp_stats.get_stats(checkpoint=False)
+    detailed_stats = dapp_stats.get_detailed_stats()
+
+    result = dapp.compact_state()
+    assert result["records"] == len(STATE_LINES)
+    assert result["source_size"] == sum(len(line) for line in lines)
+    assert result["compact_size"] < result["source_size"]
+    assert dapp_stats.get_stats(checkpoint=False) == stats
+    assert dapp_stats.get_stats(processes=3) == stats
+
+    dapp.compact_state(remove_original=True)
+    assert not app_storage.file_name("state").exists()
+    assert dapp_stats.get_stats(checkpoint=False) == stats
+    assert dapp_stats.get_stats() == stats
+    assert dapp_stats.get_detailed_stats() == detailed_stats
+    assert len(dapp.read_file("state", ensure_alive=False).splitlines()) == len(STATE_LINES)
+    with pytest.raises(DappStatsException):
+        dapp_stats.get_stats(since=datetime(2022, 12, 19, tzinfo=timezone.utc))
+
+    # the stream continues in a new state file, e.g. once the app is resumed
+    resumed_line = STATE_LINES[0].replace("10:22", "11:22")
+    app_storage.write_file("state", resumed_line)
+    stats = dapp_stats.get_stats()
+    assert stats["app"]["state_changes"] == 6
+    assert stats == dapp_stats.get_stats(checkpoint=False)
+    assert stats == dapp_stats.get_stats(processes=3, checkpoint=False)
+    assert dapp.read_file("state", ensure_alive=False).endswith(f"}}\n{resumed_line}")
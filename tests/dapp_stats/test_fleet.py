@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from dapp_stats.statistics.fleet import distribution, percentile
+
+
+def test_percentile():
+    values = [timedelta(seconds=s) for s in (1, 2, 3, 4, 5)]
+    assert percentile(values, 0) == timedelta(seconds=1)
+    assert percentile(values, 50) == timedelta(seconds=3)
+    assert percentile(values, 90) == timedelta(seconds=4.6)
+    assert percentile(values, 100) == timedelta(seconds=5)
+    assert percentile(values[:1], 99) == timedelta(seconds=1)
+
+
+def test_distribution():
+    assert distribution([]) is None
+    assert distribution([timedelta(seconds=3), timedelta(seconds=1)]) == {
+        "count": 2,
+        "min": timedelta(seconds=1),
+        "mean": timedelta(seconds=2),
+        "p50": timedelta(seconds=2),
+        "p90": timedelta(seconds=2.8),
+        "p99": timedelta(seconds=2.98),
+        "max": timedelta(seconds=3),
+    }
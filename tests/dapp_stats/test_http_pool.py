@@ -0,0 +1,99 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from dapp_stats.dapp_size_resolver import DappSizeResolver
+from dapp_stats.http_pool import HttpConnectionPool
+
+IMAGE_SIZE = 300 * 2**20
+
+
+class _RepoServer(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _RepoHandler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.requests: List[Tuple[str, str, Tuple[str, int]]] = []
+        self.head_supported = True
+
+
+class _RepoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _RepoServer
+
+    def do_HEAD(self):
+        self.server.requests.append(("HEAD", self.path, self.client_address))
+        if not self.server.head_supported:
+            self._respond(501)
+        elif self.path == "/redirect":
+            self._respond(302, {"Location": "/image.gvmi"})
+        elif self.path == "/image.gvmi":
+            self._respond(200, {"Content-Length": str(IMAGE_SIZE), "ETag": '"v1"'}, body=None)
+        else:
+            self._respond(404)
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path, self.client_address))
+        if self.path == "/image.a_image_hash.link":
+            self._respond(200, body=f"{self.server.url}/redirect".encode())
+        elif self.path == "/redirect":
+            self._respond(302, {"Location": "/image.gvmi"})
+        elif self.path == "/image.gvmi" and self.headers["Range"] == "bytes=0-0":
+            self._respond(206, {"Content-Range": f"bytes 0-0/{IMAGE_SIZE}"}, body=b"\0")
+        else:
+            self._respond(404)
+
+    def _respond(self, status, headers=None, body=b""):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if body is not None:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def repo_server():
+    server = _RepoServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_connection_pool_keep_alive(repo_server):
+    with HttpConnectionPool(timeout=5) as pool:
+        for _ in range(3):
+            response = pool.request("HEAD", f"{repo_server.url}/image.gvmi")
+            assert response.status == 200
+            assert response.headers["Content-Length"] == str(IMAGE_SIZE)
+
+        response = pool.request("GET", f"{repo_server.url}/redirect")
+        assert response.status == 404
+
+    # all the requests, the redirected one included, were sent over a single connection
+    assert len({client_address for *_, client_address in repo_server.requests}) == 1
+
+
+@pytest.mark.parametrize("head_supported", (True, False))
+def test_resolve_payload_size_probe(repo_server, mocker, head_supported):
+    repo_server.head_supported = head_supported
+    mocker.patch("dapp_stats.dapp_size_resolver.resolve_repo_srv", return_value=repo_server.url)
+
+    sizes, errors = DappSizeResolver.resolve_defined_payload_sizes(
+        [Path("tests/assets/descriptors/correct_vm_runtime_a.yaml")]
+    )
+
+    assert errors == []
+    assert sizes == {"total_size": IMAGE_SIZE, "payloads": {"a": IMAGE_SIZE}}
+    probe = ("HEAD", "/image.gvmi") if head_supported else ("GET", "/image.gvmi")
+    assert probe in [(method, path) for method, path, _ in repo_server.requests]
+    assert len({client_address for *_, client_address in repo_server.requests}) == 1
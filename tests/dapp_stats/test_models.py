@@ -1,4 +1,5 @@
-from datetime import datetime, timedelta
+import pickle
+from datetime import datetime, timedelta, timezone
 
 from dapp_stats.statistics import enums, models
 
@@ -46,3 +47,27 @@ def test_accumulated_node_stats_terminated():
     assert accumulated_node_stats._terminated is True
     assert accumulated_node_stats._time_to_launch == timedelta(minutes=2)
     assert accumulated_node_stats._working_time == timedelta(minutes=3)
+
+
+def test_node_stats_checkpoint():
+    now = datetime.now(timezone.utc)
+    node_stats = models.NodeStatistics(now, enums.NodeState.pending)
+    node_stats += models.NodeStatistics(now + timedelta(minutes=2), enums.NodeState.running)
+
+    restored = models.NodeStatistics.from_checkpoint(node_stats.to_checkpoint())
+
+    assert restored == node_stats
+    assert restored.to_dict() == node_stats.to_dict()
+
+
+def test_node_stats_update():
+    now = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    node_stats = models.NodeStatistics(now, enums.NodeState.starting)
+
+    assert node_stats.update(enums.NodeState.starting, now + timedelta(minutes=1)) is False
+    assert node_stats.update(enums.NodeState.running, now + timedelta(minutes=2)) is True
+    assert node_stats._changes == 2
+    assert node_stats._time_to_launch == timedelta(minutes=2)
+    assert node_stats.timestamp == now
+    assert not hasattr(node_stats, "__dict__")
+    assert pickle.loads(pickle.dumps(node_stats)) == node_stats
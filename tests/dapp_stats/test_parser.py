@@ -0,0 +1,49 @@
+import pydantic
+import pytest
+
+from dapp_stats.statistics import schemas
+from dapp_stats.statistics.parser import StateLogParser
+
+STATE_LINES = (
+    '{"nodes": {"db": {"0": "pending"}}, "timestamp": "2022-12-19T10:22:53Z", "app": "pending"}',
+    '{"nodes": {"db": {"0": "running"}, "http": {"0": "starting", "1": "pending"}},'
+    ' "timestamp": "2022-12-19T10:23:53.123456+00:00", "app": "starting"}',
+    '{"nodes": {}, "timestamp": "2022-12-19T10:24:53", "app": "terminated"}',
+    '{"nodes": {"db": {"0": "stopping"}}, "timestamp": 1671445493, "app": "stopping"}',
+)
+
+
+def test_parse_matches_validation():
+    parser = StateLogParser()
+
+    for line in STATE_LINES:
+        assert parser.parse(line) == schemas.StateLogEntry.parse_raw(line)
+        assert parser.parse(line.encode()) == schemas.StateLogEntry.parse_raw(line)
+
+
+def test_parse_validates_first_line_only(mocker):
+    parser = StateLogParser()
+    parse_raw = mocker.spy(schemas.StateLogEntry, "parse_raw")
+
+    for line in STATE_LINES[:3]:
+        parser.parse(line)
+
+    assert parse_raw.call_count == 1
+
+
+@pytest.mark.parametrize(
+    "line",
+    (
+        "not a json",
+        '{"nodes": {"db": {"0": "unknown"}}, "timestamp": "2022-12-19T10:22:53Z", "app": "pending"}',  # noqa
+        '{"nodes": {"db": {"0": "pending"}}, "app": "pending"}',
+        '{"nodes": {"db": {"x": "pending"}}, "timestamp": "2022-12-19T10:22:53Z", "app": "pending"}',  # noqa
+        '["pending"]',
+    ),
+)
+def test_parse_invalid_line(line):
+    parser = StateLogParser()
+    parser.parse(STATE_LINES[0])
+
+    with pytest.raises(pydantic.ValidationError):
+        parser.parse(line)
@@ -0,0 +1,60 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from dapp_stats.statistics.enums import NodeState
+from dapp_stats.statistics.models import NodeStatistics
+from dapp_stats.statistics.summary import NodeSummary
+
+
+def _random_states(seed: int, count: int):
+    rng = random.Random(seed)
+    timestamp = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    states = []
+    for i in range(count):
+        states.append((rng.choice(list(NodeState)), timestamp + timedelta(seconds=i)))
+    return states
+
+
+def _summarize(states) -> NodeSummary:
+    summary = NodeSummary.start(*states[0])
+    for state, timestamp in states[1:]:
+        summary.add(state, timestamp)
+    return summary
+
+
+def _fold(states) -> NodeStatistics:
+    (state, timestamp), *rest = states
+    stats = NodeStatistics(timestamp=timestamp, state=state)
+    for state, timestamp in rest:
+        stats += NodeStatistics(timestamp=timestamp, state=state)
+    return stats
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_summary_matches_serial_fold(seed):
+    states = _random_states(seed, 30)
+    cut_1, cut_2 = sorted(random.Random(seed).sample(range(1, len(states)), 2))
+    parts = [_summarize(part) for part in (states[:cut_1], states[cut_1:cut_2], states[cut_2:])]
+
+    expected = _fold(states)
+    assert NodeStatistics.from_summary(parts[0].merge(parts[1]).merge(parts[2])) == expected
+    assert NodeStatistics.from_summary(parts[0].merge(parts[1].merge(parts[2]))) == expected
+    assert NodeStatistics.from_summary(parts[0]).extend(parts[1]).extend(parts[2]) == expected
+    assert _fold(states[:cut_1]).extend(parts[1].merge(parts[2])) == expected
+
+
+def test_summary_boundary_transition():
+    now = datetime.now()
+    first = _summarize([(NodeState.pending, now), (NodeState.starting, now + timedelta(minutes=1))])
+    second = _summarize([(NodeState.running, now + timedelta(minutes=2))])
+
+    merged = first.merge(second)
+    assert merged.changes == 2
+    assert merged.running_at == now + timedelta(minutes=2)
+    assert merged.last_state == NodeState.running
+
+    stats = NodeStatistics.from_summary(merged)
+    assert stats._launched_successfully is True
+    assert stats._time_to_launch == timedelta(minutes=2)
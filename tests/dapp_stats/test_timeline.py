@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from dapp_stats import DappStats
+from dapp_stats.exceptions import DappStatsException
+from dapp_stats.statistics.enums import NodeState
+from dapp_stats.timeline import TIMELINE_STATES, StateTimeline
+
+from .test_dapp_stats import STATE_LINES
+
+np = pytest.importorskip("numpy")
+
+
+def _epoch_us(minute: int) -> int:
+    timestamp = datetime(2022, 12, 19, 10, minute, 53, tzinfo=timezone.utc)
+    return int(timestamp.timestamp()) * 1_000_000
+
+
+@pytest.mark.parametrize("mmap", (True, False))
+def test_export_timeline(app_storage, tmp_path, mocker, mmap):
+    mocker.patch("dapp_stats.timeline.TIMELINE_BUFFER_ROWS", 2)
+    for line in STATE_LINES:
+        app_storage.write_file("state", line)
+    output = tmp_path / "timeline.npz"
+
+    assert DappStats("app_id").export_timeline(output) == 13
+
+    timeline = StateTimeline.load(output, mmap=mmap)
+    assert isinstance(timeline.timestamp, np.memmap) is mmap
+    assert timeline.node_labels == ["app", "db[0]", "http[0]"]
+    assert timeline.end_timestamp == _epoch_us(28)
+    assert timeline.timestamp.dtype == np.int64
+    assert timeline.state.dtype == np.int8
+
+    db_rows = timeline.node == 1
+    assert [TIMELINE_STATES[code] for code in timeline.state[db_rows]] == [
+        NodeState.pending,
+        NodeState.starting,
+        NodeState.running,
+        NodeState.terminated,
+    ]
+    assert timeline.timestamp[db_rows].tolist() == [_epoch_us(m) for m in (22, 23, 24, 27)]
+    # loaded arrays are the same as the ones of a regular numpy load
+    with np.load(output) as npz:
+        assert (npz["node"] == timeline.node).all()
+
+
+def test_export_timeline_empty(app_storage, tmp_path):
+    output = tmp_path / "timeline.npz"
+    assert DappStats("app_id").export_timeline(output) == 0
+
+    timeline = StateTimeline.load(output)
+    assert len(timeline.timestamp) == 0
+    assert timeline.node_labels == ["app"]
+
+
+def test_load_timeline_invalid(tmp_path):
+    path = tmp_path / "timeline.npz"
+    path.write_text("not a timeline")
+    with pytest.raises(DappStatsException):
+        StateTimeline.load(path)
+
+
+def test_timeline_metrics(app_storage):
+    lines = [
+        '{"nodes": {"db": {"0": "pending", "1": "pending"}}, "timestamp": "2022-12-19T10:00:00Z", "app": "pending"}\n',  # noqa
+        '{"nodes": {"db": {"0": "running", "1": "starting"}}, "timestamp": "2022-12-19T10:01:00Z", "app": "starting"}\n',  # noqa
+        '{"nodes": {"db": {"0": "unresponsive", "1": "running"}}, "timestamp": "2022-12-19T10:04:00Z", "app": "running"}\n',  # noqa
+        '{"nodes": {"db": {"0": "running", "1": "running"}}, "timestamp": "2022-12-19T10:05:00Z", "app": "running"}\n',  # noqa
+        '{"nodes": {"db": {"0": "unresponsive", "1": "running"}}, "timestamp": "2022-12-19T10:20:00Z", "app": "running"}\n',  # noqa
+        '{"nodes": {"db": {"0": "running", "1": "running"}}, "timestamp": "2022-12-19T10:30:00Z", "app": "running"}\n',  # noqa
+    ]
+    for line in lines:
+        app_storage.write_file("state", line)
+
+    metrics = DappStats("app_id").get_detailed_stats()
+
+    db_0 = metrics["nodes"]["db"][0]
+    assert db_0["time_in_state"] == {
+        "pending": timedelta(minutes=1),
+        "running": timedelta(minutes=18),
+        "unresponsive": timedelta(minutes=11),
+    }
+    assert db_0["unresponsive_episodes"] == 2
+    assert db_0["flapping_rate"] == 4
+    assert db_0["time_to_launch"] == timedelta(minutes=1)
+    assert metrics["nodes"]["db"][1]["time_to_launch"] == timedelta(minutes=4)
+
+    db = metrics["services"]["db"]
+    assert db["replicas"] == 2
+    assert db["unresponsive_episodes"] == 2
+    assert db["time_in_state"]["running"] == timedelta(minutes=44)
+    assert db["time_to_launch"] == {
+        "p50": timedelta(minutes=2, seconds=30),
+        "p90": timedelta(minutes=3, seconds=42),
+        "p99": timedelta(minutes=3, seconds=58, microseconds=200000),
+    }
+    assert metrics["app"]["time_in_state"]["running"] == timedelta(minutes=26)
+    assert metrics["app"]["time_to_launch"] == timedelta(minutes=4)
+
+
+def test_timeline_metrics_empty(app_storage):
+    assert DappStats("app_id").get_detailed_stats() == {"app": {}, "nodes": {}, "services": {}}
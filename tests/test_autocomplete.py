@@ -0,0 +1,102 @@
+import sys
+
+import click
+import pytest
+
+from dapp_manager import DappManager
+from dapp_manager.autocomplete.app_ids import (
+    APP_ID_COMMANDS,
+    APP_IDS_COMMANDS,
+    AppIdIndex,
+    complete_app_ids,
+    try_fast_completion,
+)
+from dapp_manager.cli import cli
+
+from .helpers import asset_path, start_dapp
+
+
+@pytest.fixture
+def app_id_index():
+    return AppIdIndex(DappManager._get_data_dir(), DappManager._get_cache_dir())
+
+
+def test_app_id_index_cached(app_id_index, mocker):
+    dapp = start_dapp([sys.executable, asset_path("sleep.py"), "3"])
+    assert app_id_index.load() == [(dapp.app_id, True)]
+    assert app_id_index.index_file.exists()
+
+    scan = mocker.spy(app_id_index, "_scan")
+    assert app_id_index.load() == [(dapp.app_id, True)]
+    scan.assert_not_called()
+
+
+def test_app_id_index_invalidated_by_new_app(app_id_index):
+    dapp_1 = start_dapp([sys.executable, asset_path("sleep.py"), "3"])
+    assert app_id_index.load() == [(dapp_1.app_id, True)]
+
+    dapp_2 = start_dapp([sys.executable, asset_path("sleep.py"), "3"])
+    assert [app_id for app_id, _ in app_id_index.load()] == [dapp_1.app_id, dapp_2.app_id]
+
+
+def test_complete_app_ids_prefers_running():
+    dapp_1 = start_dapp([sys.executable, asset_path("sleep.py"), "3"])
+    dapp_1.kill()
+    dapp_2 = start_dapp([sys.executable, asset_path("sleep.py"), "3"])
+
+    assert complete_app_ids("") == [dapp_2.app_id, dapp_1.app_id]
+    assert complete_app_ids("", prefer_running=False) == [dapp_1.app_id, dapp_2.app_id]
+    assert complete_app_ids(dapp_1.app_id[:20]) == [dapp_1.app_id]
+
+
+@pytest.mark.parametrize(
+    "complete_instr, expected_output",
+    (
+        ("complete", "{app_id}\n"),
+        ("complete_zsh", "{app_id}\n_\n"),
+    ),
+)
+def test_fast_completion(complete_instr, expected_output, monkeypatch, capsys):
+    dapp = start_dapp([sys.executable, asset_path("sleep.py"), "3"])
+    monkeypatch.setenv("_DAPP_MANAGER_COMPLETE", complete_instr)
+    monkeypatch.setenv("COMP_WORDS", "dapp-manager stop ")
+    monkeypatch.setenv("COMP_CWORD", "2")
+
+    assert try_fast_completion()
+    assert capsys.readouterr().out == expected_output.format(app_id=dapp.app_id)
+
+
+@pytest.mark.parametrize(
+    "comp_words, comp_cword",
+    (
+        ("dapp-manager ", "1"),
+        ("dapp-manager read some_app ", "3"),
+        ("dapp-manager stop --timeout ", "3"),
+        ("dapp-manager resume-many -c config.yml ", "4"),
+    ),
+)
+def test_fast_completion_fallback(comp_words, comp_cword, monkeypatch, capsys):
+    monkeypatch.setenv("_DAPP_MANAGER_COMPLETE", "complete")
+    monkeypatch.setenv("COMP_WORDS", comp_words)
+    monkeypatch.setenv("COMP_CWORD", comp_cword)
+
+    assert not try_fast_completion()
+    assert capsys.readouterr().out == ""
+
+
+def test_app_id_commands_match_cli():
+    def _first_argument(command: click.Command):
+        arguments = [param for param in command.params if isinstance(param, click.Argument)]
+        return arguments[0] if arguments else None
+
+    app_id_commands = set()
+    app_ids_commands = set()
+    for name, command in cli.commands.items():
+        argument = _first_argument(command)
+        if argument is not None and argument.name == "app_id":
+            app_id_commands.add(name)
+        elif argument is not None and argument.name == "app_ids":
+            app_ids_commands.add(name)
+
+    assert app_id_commands == APP_ID_COMMANDS
+    assert app_ids_commands == APP_IDS_COMMANDS
@@ -0,0 +1,82 @@
+import json
+import sys
+from unittest import mock
+
+import pytest
+
+from dapp_manager import DappManager
+from dapp_manager.batch import BatchRunner
+
+from .helpers import asset_path
+
+
+@pytest.fixture
+def mocked_runner_command():
+    def _get_command(self):
+        return [
+            sys.executable,
+            asset_path("worker_with_log_files.py"),
+            str(self.storage.file_name("state").resolve()),
+            str(self.storage.file_name("data").resolve()),
+        ]
+
+    with mock.patch("dapp_manager.dapp_starter.DappStarter._get_command", new=_get_command):
+        yield
+
+
+def _command(command: str, **kwargs) -> str:
+    return json.dumps({"command": command, "args": kwargs, "id": command})
+
+
+@pytest.mark.parametrize("max_workers", (1, 4))
+def test_batch(max_workers, mocked_runner_command):
+    start_results = [
+        *BatchRunner(max_workers).run(
+            [_command("start", descriptors=[".gitignore"], config=".gitignore", timeout=0.5)] * 3
+        )
+    ]
+    assert all(result["ok"] for result in start_results)
+    app_ids = [result["result"] for result in start_results]
+
+    with open(asset_path("mock_state_file.txt")) as f:
+        expected_state = f.read()
+
+    results = [
+        *BatchRunner(max_workers).run(
+            [
+                _command("list"),
+                # The reads may run concurrently with the kill below
+                *[
+                    _command("read", app_id=app_id, file_type="state", ensure_alive=False)
+                    for app_id in app_ids
+                ],
+                "",
+                _command("kill", app_id=app_ids[0]),
+                _command("read", app_id="no_such_app", file_type="state"),
+                _command("no_such_command"),
+                "not a json",
+            ]
+        )
+    ]
+
+    assert [result["command"] for result in results] == [
+        "list",
+        "read",
+        "read",
+        "read",
+        "kill",
+        "read",
+        "no_such_command",
+        None,
+    ]
+    assert [result["ok"] for result in results] == [True] * 5 + [False] * 3
+    assert sorted(results[0]["result"]) == sorted(app_ids)
+    assert [result["result"] for result in results[1:4]] == [expected_state] * 3
+
+    assert results[5]["error"]["type"] == "UnknownApp"
+    assert results[5]["error"]["exit_code"] == 4
+    assert results[6]["error"]["type"] == "ValueError"
+    assert results[6]["id"] == "no_such_command"
+    assert "id" not in results[7]
+
+    assert not DappManager(app_ids[0]).alive
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+from datetime import timedelta
+from typing import Dict, List
+
+import pytest
+
+# Modules that are expensive to import and are only needed by some of the commands
+HEAVY_MODULES = ("dapp_runner", "yapapi", "requests", "mako", "colors")
+
+# Generous, to keep the test stable on slow CI machines - the actual import takes ~40ms
+IMPORT_TIME_BUDGET = timedelta(milliseconds=100)
+
+
+def _run_with_import_profile(args: List[str], env: Dict[str, str]) -> Dict[str, int]:
+    """Run python with the given args, return a map of imported modules to cumulative time [us]."""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        env={**os.environ, **env},
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        profile[module.strip()] = int(cumulative)
+    return profile
+
+
+@pytest.fixture
+def cli_env(tmp_path):
+    return {"XDG_DATA_HOME": str(tmp_path / "data"), "XDG_CACHE_HOME": str(tmp_path / "cache")}
+
+
+@pytest.mark.parametrize(
+    "args",
+    (
+        ["list"],
+        ["read", "no_such_app", "state"],
+    ),
+    ids=("list", "read"),
+)
+def test_light_commands_skip_heavy_imports(args, cli_env):
+    profile = _run_with_import_profile(["-m", "dapp_manager", *args], cli_env)
+
+    assert "dapp_manager.cli" in profile
+    assert [module for module in profile if module.split(".")[0] in HEAVY_MODULES] == []
+
+
+def test_app_id_completion_skips_cli_import(cli_env):
+    profile = _run_with_import_profile(
+        ["-m", "dapp_manager"],
+        {
+            **cli_env,
+            "_DAPP_MANAGER_COMPLETE": "complete",
+            "COMP_WORDS": "dapp-manager read ",
+            "COMP_CWORD": "2",
+        },
+    )
+
+    assert "dapp_manager.autocomplete.app_ids" in profile
+    assert "dapp_manager.cli" not in profile
+    assert "click" not in profile
+    assert [module for module in profile if module.split(".")[0] in HEAVY_MODULES] == []
+
+
+def test_cli_import_time(cli_env):
+    profile = _run_with_import_profile(["-c", "import dapp_manager.cli"], cli_env)
+
+    assert timedelta(microseconds=profile["dapp_manager.cli"]) < IMPORT_TIME_BUDGET
@@ -1,3 +1,4 @@
+import json
 import random
 import string
 import sys
@@ -10,7 +11,7 @@ import psutil
 import pytest
 
 from dapp_manager import DappManager
-from dapp_manager.exceptions import AppNotRunning, StartupFailed, UnknownApp
+from dapp_manager.exceptions import AppNotRunning, AppRunning, StartupFailed, UnknownApp
 
 from .helpers import (
     all_dm_methods_args,
@@ -140,6 +141,31 @@ def test_read_file_follow(get_dapp, file_type):
         iterator.close()
 
 
+def test_compact_state():
+    dapp = start_dapp(
+        [sys.executable, asset_path("worker_with_log_files.py")], state_file=True, data_file=True
+    )
+    sleep(0.5)  # Wait for the mock state file to be written
+    state_lines = [
+        f'{{"nodes": {{}}, "timestamp": "2022-12-19T10:22:5{second}Z", "app": "pending"}}\n'
+        for second in range(3)
+    ]
+    dapp.storage.file_name("state").write_text("".join(state_lines))
+
+    with pytest.raises(AppRunning):
+        dapp.compact_state(remove_original=True)
+
+    assert dapp.compact_state()["records"] == 1
+    # the original lines are kept
+    assert dapp.read_file("state") == "".join(state_lines)
+
+    dapp.kill()
+    assert dapp.compact_state(remove_original=True)["original_removed"] is True
+    record = json.loads(dapp.read_file("state", ensure_alive=False))
+    assert record["until"] == "2022-12-19T10:22:52Z"
+    assert record["repeat"] == 3
+
+
 @pytest.mark.parametrize("get_dapp", get_dapp_scenarios)
 @pytest.mark.parametrize("file_type", ("state", "data"))
 def test_read_file_follow_not_running_initially(get_dapp, file_type):
@@ -355,3 +381,56 @@ def test_process_apparently_restarted():
         lambda _: (datetime.now(tz=timezone.utc) + timedelta(minutes=5)).timestamp(),
     ):
         assert not dapp.alive
+
+
+def test_suspend_many(mocker):
+    dapp_1 = start_dapp([sys.executable, asset_path("sleep.py"), "3"])
+    dapp_2 = start_dapp([sys.executable, asset_path("sleep.py"), "3"])
+    dapp_3 = start_dapp([sys.executable, asset_path("sleep.py"), "3"])
+    for port, dapp in enumerate((dapp_1, dapp_2), start=8000):
+        dapp.storage.save_api_host("127.0.0.1")
+        dapp.storage.save_api_port(port)
+
+    mocked_post = mocker.patch("requests.post")
+    mocked_post.return_value.status_code = 200
+    mocked_post.return_value.text = "{}"
+
+    results = {result.app_id: result for result in DappManager.suspend_many()}
+
+    assert results.keys() == {dapp_1.app_id, dapp_2.app_id, dapp_3.app_id}
+    assert results[dapp_1.app_id].success
+    assert results[dapp_2.app_id].success
+    assert not results[dapp_3.app_id].success
+    assert "GAOM API unavailable" in str(results[dapp_3.app_id].error)
+    assert dapp_1.storage.gaom_saved
+    assert dapp_2.storage.gaom_saved
+    assert not dapp_3.storage.gaom_saved
+    assert sorted(call.args[0] for call in mocked_post.call_args_list) == [
+        "http://127.0.0.1:8000/suspend",
+        "http://127.0.0.1:8001/suspend",
+    ]
+
+
+def test_resume_many():
+    dapp_1 = start_dapp([sys.executable, asset_path("echo.py"), "foo"])
+    dapp_2 = start_dapp([sys.executable, asset_path("echo.py"), "bar"])
+    dapp_3 = start_dapp([sys.executable, asset_path("echo.py"), "baz"])
+    sleep(0.5)
+    for dapp in (dapp_1, dapp_2):
+        dapp.storage.write_file("gaom_save", "{}")
+
+    def _get_command(self):
+        return [sys.executable, asset_path("sleep.py"), "3"]
+
+    with mock.patch("dapp_manager.dapp_starter.DappStarter._get_command", new=_get_command):
+        results = DappManager.resume_many(config=".gitignore", timeout=0)
+
+    assert {result.app_id for result in results} == {dapp_1.app_id, dapp_2.app_id}
+    assert all(result.success for result in results)
+    assert dapp_1.alive
+    assert dapp_2.alive
+    assert not dapp_3.alive
+
+    results = DappManager.resume_many([dapp_3.app_id], config=".gitignore", timeout=0)
+    assert not results[0].success
+    assert "No saved GAOM state" in str(results[0].error)